@@ -17,18 +17,30 @@ import pulumi_kubernetes as kubernetes
 from pulumi_kubernetes.core.v1 import Namespace
 
 import config
+import digests
+import instrumentation
+import sharding
 import infrastructure.builder as infrastructure
 import products.products as products
+import products.autoscaling as autoscaling
+import products.observability as observability
 import products.schema_registry as schema_registry
 import products.persistor as persistor
 import products.schema_registry_validator as schema_registry_validator
 
 
 def deploy_infrastructure():
-    kubernetes_provider = infrastructure.create_cluster(config.cluster)
-    broker_resources, brokers_platform_config = infrastructure.create_brokers(config.brokers)
-    storage_resources, storage_platform_config = infrastructure.create_storage(config.storage)
-    account_platform_config = infrastructure.create_accounts(config.accounts, broker_resources, storage_resources)
+    if config.shard:
+        return sharding.deploy_shard(config.shard)
+
+    with instrumentation.phase("create_cluster"):
+        kubernetes_provider = infrastructure.create_cluster(config.cluster)
+    with instrumentation.phase("create_brokers"):
+        broker_resources, brokers_platform_config = infrastructure.create_brokers(config.brokers)
+    with instrumentation.phase("create_storage"):
+        storage_resources, storage_platform_config = infrastructure.create_storage(config.storage)
+    with instrumentation.phase("create_accounts"):
+        account_platform_config = infrastructure.create_accounts(config.accounts, broker_resources, storage_resources)
 
     return kubernetes_provider, brokers_platform_config, storage_platform_config, account_platform_config
 
@@ -46,23 +58,63 @@ def create_namespace(namespace_name: str, kubernetes_provider: kubernetes.Provid
     )
 
 
+def deploy_chart(values, name, namespace: Namespace, autoscaled_components: list = None):
+    scale_target_names = set()
+    for component in autoscaled_components or []:
+        scale_target_names.update(autoscaling.get_scale_target_names(config.autoscaling, component))
+    transformations = [autoscaling.ignore_scaled_replicas(scale_target_names)] if scale_target_names else []
+    node_pool = config.chart_node_pools.get(name)
+    if node_pool:
+        transformations.append(products.place_on_node_pool(node_pool))
+
+    with instrumentation.phase(f"deploy_chart:{name}"):
+        chart = products.deploy_chart(values, name, namespace, transformations)
+    # chart templates are rendered asynchronously, after deploy_chart returns
+    instrumentation.track(f"render_chart:{name}", chart.ready)
+    digests.register(f"chart:{name}", {
+        "values": values,
+        "autoscaling": {component: config.autoscaling.get(component) for component in autoscaled_components or []},
+        "nodePool": node_pool,
+    }, chart)
+    return chart
+
+
+def create_scaled_objects(components: list, brokers_platform_config, namespace: Namespace, chart):
+    for component in components:
+        autoscaling.create_scaled_objects(config.autoscaling, component, config.brokers, brokers_platform_config, namespace, depends_on=[chart])
+
+
 def deploy_products(kubernetes_provider, brokers_platform_config, storage_platform_config, account_platform_config):
     namespace = create_namespace(config.namespace, kubernetes_provider)
+    digests.register("namespace", config.namespace, namespace)
 
     schema_registry_svc_name = None
     if config.deploy_schema_registry:
         schema_registry_values = schema_registry.create_chart_values(config.schema_registry_chart_config, namespace)
         schema_registry_svc_name = schema_registry_values["registrySvcName"]
-        products.deploy_chart(schema_registry_values, "dataphos-schema-registry", namespace)
+        deploy_chart(schema_registry_values, "dataphos-schema-registry", namespace)
 
     if config.deploy_persistor:
         persistor_values = persistor.create_chart_values(config.persistor_chart_config, brokers_platform_config, storage_platform_config, account_platform_config, namespace)
-        products.deploy_chart(persistor_values, "dataphos-persistor", namespace)
+        persistor_chart = deploy_chart(persistor_values, "dataphos-persistor", namespace, ["persistor", "indexer"])
+        create_scaled_objects(["persistor", "indexer"], brokers_platform_config, namespace, persistor_chart)
 
     if config.deploy_schema_registry_validator:
         schema_registry_validator_values = schema_registry_validator.create_chart_values(config.schema_registry_validator_chart_config, schema_registry_svc_name, brokers_platform_config, account_platform_config, namespace)
-        products.deploy_chart(schema_registry_validator_values, "dataphos-schema-registry-validator", namespace)
+        validator_chart = deploy_chart(schema_registry_validator_values, "dataphos-schema-registry-validator", namespace, ["validator"])
+        create_scaled_objects(["validator"], brokers_platform_config, namespace, validator_chart)
+
+    if config.observability:
+        with instrumentation.phase("create_observability"):
+            observability_resources = observability.create_observability(config.observability, namespace)
+        digests.register("observability", config.observability, *observability_resources)
 
 
-infrastructure_export = deploy_infrastructure()
-deploy_products(*infrastructure_export)
+with instrumentation.phase("deploy_infrastructure"):
+    infrastructure_export = deploy_infrastructure()
+# platform, broker and storage shards do not deploy the products
+if infrastructure_export:
+    with instrumentation.phase("deploy_products"):
+        deploy_products(*infrastructure_export)
+digests.export_digests()
+instrumentation.export_metrics()
@@ -0,0 +1,55 @@
+# Copyright 2024 Syntio Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+import pulumi
+import yaml
+
+
+class BenchmarkMocks(pulumi.runtime.Mocks):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.resource_count = 0
+        self.invoke_count = 0
+        self.invoke_tokens = {}
+
+    def new_resource(self, args: pulumi.runtime.MockResourceArgs):
+        with self._lock:
+            self.resource_count += 1
+
+        outputs = dict(args.inputs)
+        outputs.setdefault("name", args.name)
+        if args.typ == "gcp:container/cluster:Cluster":
+            outputs.update(endpoint="127.0.0.1", masterAuth={"clusterCaCertificate": "Y2VydA=="}, location="europe-west2-a")
+        if args.typ.startswith("kubernetes:core/v1:Service"):
+            outputs.setdefault("spec", {}).update(clusterIp="10.0.0.1", ports=[{"port": 9091}, {"port": 9092}])
+        return [f"{args.name}_id", outputs]
+
+    def call(self, args: pulumi.runtime.MockCallArgs):
+        with self._lock:
+            self.invoke_count += 1
+            self.invoke_tokens[args.token] = self.invoke_tokens.get(args.token, 0) + 1
+
+        if args.token == "kubernetes:yaml:decode":
+            return {"result": [document for document in yaml.safe_load_all(args.args["text"]) if document]}
+        if args.token == "kubernetes:helm:template":
+            return {"result": []}
+        if args.token.startswith("azuread:index/getClientConfig"):
+            return {"objectId": "00000000-0000-0000-0000-000000000000"}
+        if ":list" in args.token or "/list" in args.token:
+            return {"primaryConnectionString": "Endpoint=sb://benchmark/", "kubeconfigs": [{"value": "YXBpVmVyc2lvbjogdjE="}]}
+        # every other invoke is an existence lookup of a resource that does not exist yet
+        return {}, [("id", "resource not found")]
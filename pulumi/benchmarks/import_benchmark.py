@@ -0,0 +1,70 @@
+# Copyright 2024 Syntio Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import json
+import subprocess
+import sys
+
+from run_benchmarks import PROVIDER_SDKS, run_isolated
+from stack_generator import BROKER_TYPES
+
+IMPORT_TIMER = """
+import json, resource, sys, time
+start_time = time.perf_counter()
+import {package}
+print(json.dumps({{"importTime": round(time.perf_counter() - start_time, 3), "peakRssMb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}}))
+"""
+
+
+def measure_sdk_import(package_name: str, timeout: int) -> dict:
+    # Cold import of a single SDK in a fresh interpreter
+    command = [sys.executable, "-c", IMPORT_TIMER.format(package=package_name)]
+    try:
+        process = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"sdk": package_name, "error": f"timed out after {timeout}s"}
+    if process.returncode != 0:
+        stderr = process.stderr.strip().splitlines()
+        return {"sdk": package_name, "error": stderr[-1] if stderr else f"exit code {process.returncode}"}
+    return {"sdk": package_name, **json.loads(process.stdout.strip().splitlines()[-1])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure provider SDK import costs and the SDKs loaded by each stack type.")
+    parser.add_argument("--broker", action="append", choices=BROKER_TYPES, help="broker type to benchmark, can be repeated (default: all)")
+    parser.add_argument("--size", type=int, default=10, help="number of topics, buckets and product instances of the synthetic stacks")
+    parser.add_argument("--timeout", type=int, default=600, help="timeout of a single measurement in seconds")
+    parser.add_argument("--output", help="write the results to a JSON file")
+    args = parser.parse_args()
+
+    sdk_results = [measure_sdk_import(package_name, args.timeout) for package_name in PROVIDER_SDKS]
+    print(f"{'sdk':<22}{'import time (s)':>16}{'peak RSS (MB)':>16}  error")
+    for result in sdk_results:
+        print(f"{result['sdk']:<22}{result.get('importTime', '-'):>16}{result.get('peakRssMb', '-'):>16}  {result.get('error') or ''}")
+    print()
+
+    stack_results = [run_isolated(broker_type, args.size, args.timeout) for broker_type in args.broker or BROKER_TYPES]
+    print(f"{'broker':<12}{'wall time (s)':>16}{'peak RSS (MB)':>16}  loaded SDKs")
+    for result in stack_results:
+        loaded_sdks = ", ".join(f"{package_name} ({count} modules)" for package_name, count in sorted(result.get("loadedSdks", {}).items()))
+        print(f"{result['broker']:<12}{result.get('wallTime', '-'):>16}{result.get('peakRssMb', '-'):>16}  {loaded_sdks or result.get('error')}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"sdks": sdk_results, "stacks": stack_results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# Copyright 2024 Syntio Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import contextlib
+import json
+import os
+import resource
+import runpy
+import subprocess
+import sys
+import tempfile
+import time
+
+import pulumi
+from pulumi.runtime.stack import wait_for_rpcs
+from pulumi.runtime.sync_await import _sync_await
+
+from BenchmarkMocks import BenchmarkMocks
+from stack_generator import BROKER_TYPES, generate_stack_config
+
+PROGRAM_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_NAME = "dataphos"
+STACK_NAME = "benchmark"
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+PROVIDER_SDKS = ["pulumi_gcp", "pulumi_azure_native", "pulumi_azuread", "pulumi_kubernetes"]
+
+
+def get_loaded_sdks() -> dict[str, int]:
+    # Number of loaded modules of every imported provider SDK
+    loaded_sdks = {}
+    for module_name in sys.modules:
+        package_name = module_name.split(".")[0]
+        if package_name in PROVIDER_SDKS:
+            loaded_sdks[package_name] = loaded_sdks.get(package_name, 0) + 1
+    return loaded_sdks
+
+
+def run_program(broker_type: str, size: int) -> dict:
+    # Runs the Pulumi program once against runtime mocks in the current process
+    stack_config = generate_stack_config(broker_type, size)
+    all_config = {}
+    for key, value in stack_config.items():
+        config_key = key if ":" in key else f"{PROJECT_NAME}:{key}"
+        all_config[config_key] = value if isinstance(value, str) else json.dumps(value)
+
+    mocks = BenchmarkMocks()
+    pulumi.runtime.set_all_config(all_config)
+    pulumi.runtime.set_mocks(mocks, project=PROJECT_NAME, stack=STACK_NAME, preview=False)
+
+    os.chdir(PROGRAM_DIR)
+    sys.path.insert(0, PROGRAM_DIR)
+    error = None
+    start_time = time.perf_counter()
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            runpy.run_path(os.path.join(PROGRAM_DIR, "__main__.py"), run_name="__main__")
+            _sync_await(wait_for_rpcs())
+    except Exception as e:
+        error = f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"
+    wall_time = time.perf_counter() - start_time
+
+    return {
+        "broker": broker_type,
+        "size": size,
+        "wallTime": round(wall_time, 3),
+        # ru_maxrss is reported in kilobytes on Linux
+        "peakRssMb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "resources": mocks.resource_count,
+        "invokes": mocks.invoke_count,
+        "loadedSdks": get_loaded_sdks(),
+        "error": error,
+    }
+
+
+def run_isolated(broker_type: str, size: int, timeout: int) -> dict:
+    # Every measurement runs in a fresh interpreter so peak RSS and module state are not shared between runs
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        result_file = os.path.join(tmp_dir, "result.json")
+        command = [sys.executable, os.path.abspath(__file__), "--single", "--broker", broker_type, "--size", str(size), "--result-file", result_file]
+        try:
+            process = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return {"broker": broker_type, "size": size, "error": f"timed out after {timeout}s"}
+
+        if not os.path.exists(result_file):
+            stderr = process.stderr.strip().splitlines()
+            return {"broker": broker_type, "size": size, "error": stderr[-1] if stderr else f"exit code {process.returncode}"}
+        with open(result_file) as f:
+            return json.load(f)
+
+
+def print_results(results: list[dict]):
+    header = f"{'broker':<12}{'size':>8}{'wall time (s)':>16}{'peak RSS (MB)':>16}{'resources':>12}{'invokes':>10}  error"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        print(
+            f"{result['broker']:<12}{result['size']:>8}"
+            f"{result.get('wallTime', '-'):>16}{result.get('peakRssMb', '-'):>16}"
+            f"{result.get('resources', '-'):>12}{result.get('invokes', '-'):>10}"
+            f"  {result.get('error') or ''}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Dataphos Pulumi program against runtime mocks.")
+    parser.add_argument("--broker", action="append", choices=BROKER_TYPES, help="broker type to benchmark, can be repeated (default: all)")
+    parser.add_argument("--size", action="append", type=int, help="number of topics, buckets and product instances, can be repeated (default: 10, 100, 1000, 10000)")
+    parser.add_argument("--timeout", type=int, default=3600, help="timeout of a single run in seconds")
+    parser.add_argument("--output", help="write the results to a JSON file")
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    broker_types = args.broker or BROKER_TYPES
+    sizes = args.size or DEFAULT_SIZES
+
+    if args.single:
+        result = run_program(broker_types[0], sizes[0])
+        with open(args.result_file, "w") as f:
+            json.dump(result, f)
+        # skip interpreter teardown of the lookup threads and gRPC channels
+        os._exit(0)
+
+    results = []
+    for broker_type in broker_types:
+        for size in sizes:
+            print(f"Running {broker_type} benchmark with size {size}", file=sys.stderr)
+            results.append(run_isolated(broker_type, size, args.timeout))
+
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# Copyright 2024 Syntio Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+BROKER_TYPES = ["pubsub", "servicebus", "kafka"]
+
+GCP_PROJECT = "dataphos-benchmark"
+AZURE_RESOURCE_GROUP = "dataphos-benchmark-rg"
+
+
+def _cluster_config(broker_type: str) -> dict:
+    if broker_type == "servicebus":
+        return {
+            "aks-cluster": {
+                "type": "aks",
+                "name": "aks-cluster",
+                "resourceGroup": AZURE_RESOURCE_GROUP,
+            },
+        }
+    return {
+        "gke-cluster": {
+            "type": "gke",
+            "name": "gke-cluster",
+            "projectID": GCP_PROJECT,
+            "location": "europe-west2-a",
+        },
+    }
+
+
+def _broker_config(broker_type: str, topics: dict) -> dict:
+    if broker_type == "pubsub":
+        return {"type": "pubsub", "projectID": GCP_PROJECT, "topics": topics}
+    if broker_type == "servicebus":
+        return {"type": "servicebus", "resourceGroup": AZURE_RESOURCE_GROUP, "azsbNamespace": "dataphos-benchmark-ns", "topics": topics}
+    return {"type": "kafka", "clusterNamespace": "kafka-cluster", "clusterName": "kafka-cluster", "topics": topics}
+
+
+def _storage_config(broker_type: str, buckets: dict) -> tuple[str, dict]:
+    if broker_type == "servicebus":
+        return "azure-blob-storage", {"type": "abs", "resourceGroup": AZURE_RESOURCE_GROUP, "accountStorageID": "dataphosbenchmarkacc", "buckets": buckets}
+    return "google-cloud-storage", {"type": "gcs", "projectID": GCP_PROJECT, "buckets": buckets}
+
+
+def generate_stack_config(broker_type: str, size: int) -> dict:
+    # Every instance reads its own topic, so a stack of the given size has
+    # size topics, 2 * size subscriptions, size buckets and size persistor and validator instances
+    topics = {}
+    buckets = {}
+    persistors = {}
+    validators = {}
+    for i in range(size):
+        topic_name = f"topic-{i}"
+        topics[topic_name] = {
+            "subscriptions": {
+                f"{topic_name}-per": {},
+                f"{topic_name}-scval": {},
+            },
+        }
+        buckets[f"dataphos-benchmark-bucket-{i}"] = {}
+
+    storage_id, storage_config = _storage_config(broker_type, buckets)
+    for i in range(size):
+        persistors[f"persistor-{i}"] = {
+            "broker": broker_type,
+            "topic": f"topic-{i}",
+            "consumerID": f"topic-{i}-per",
+            "storage": storage_id,
+            "storageTargetID": f"dataphos-benchmark-bucket-{i}",
+            "replicas": 1,
+        }
+        validators[f"validator-{i}"] = {
+            "broker": broker_type,
+            "destinationBroker": broker_type,
+            "topic": f"topic-{i}",
+            "consumerID": f"topic-{i}-scval",
+            "validTopic": f"topic-{(i + 1) % size}",
+            "deadletterTopic": f"topic-{(i + 2) % size}",
+            "replicas": 1,
+        }
+
+    stack_config = {
+        "namespace": "dataphos",
+        "deploySchemaRegistry": True,
+        "deploySchemaRegistryValidator": True,
+        "deployPersistor": True,
+        "resourceTags": {"team": "dataphos", "env": "benchmark"},
+        "dataphos-schema-registry": {
+            "registryReplicas": 1,
+            "database": {"name": "postgres", "username": "postgres", "password": "benchmark"},
+        },
+        "dataphos-schema-registry-validator": {"validator": validators},
+        "dataphos-persistor": {"persistor": persistors},
+        "cluster": _cluster_config(broker_type),
+        "brokers": {broker_type: _broker_config(broker_type, topics)},
+        "storage": {storage_id: storage_config},
+    }
+    if broker_type == "servicebus":
+        stack_config["azure-native:location"] = "westeurope"
+    else:
+        stack_config["gcp:project"] = GCP_PROJECT
+        stack_config["gcp:region"] = "europe-west2"
+    return stack_config
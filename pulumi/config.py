@@ -34,6 +34,26 @@ def add_storage_config(chart_config, storage_id):
         chart_config["storage"][storage_id]["type"] = storage[storage_id]["type"]
 
 
+def add_autoscaling_config(component, instance_id, instance_config):
+    # the autoscaling block configures KEDA and is not passed to the chart
+    autoscaling_config = instance_config.pop("autoscaling", None)
+    if not autoscaling_config or autoscaling_config.get("enabled", True) is not True: return
+    autoscaling.setdefault(component, {})[instance_id] = {
+        **autoscaling_config,
+        "broker": instance_config["broker"],
+        "topic": instance_config["topic"],
+        "consumerID": instance_config["consumerID"],
+    }
+
+
+def add_dead_letter_policy(broker_id, topic_id, subscription_id, dl_broker_id, dl_topic):
+    # Pub/Sub forwards messages the consumer repeatedly fails to acknowledge to its dead letter topic
+    if brokers[broker_id]["type"] != "pubsub" or dl_broker_id != broker_id: return
+    subscription_config = brokers[broker_id].get("topics", {}).get(topic_id, {}).get("subscriptions", {}).get(subscription_id)
+    if subscription_config is None or "deadLetterPolicies" in subscription_config: return
+    subscription_config["deadLetterPolicies"] = [{"deadLetterTopic": dl_topic}]
+
+
 class AccountConfig:
 
     def __init__(self, instance_id: str, instance_config: dict, resource_config: dict):
@@ -56,11 +76,11 @@ class AccountConfig:
         }
         if topic_id: role["topic"] = topic_id
         if sub_key: role["consumerID"] = self.instance_config[sub_key]
-        self.account_config["roles"].append(role)
+        self._add_role(role)
         # always add broker viewer role
         role = dict(role)
         role["roleID"] = AccountRoleID.BROKER_VIEWER
-        self.account_config["roles"].append(role)
+        self._add_role(role)
 
     def add_storage_role(self, role_id, role_scope, storage_id, bucket_key=None):
         role = {
@@ -69,9 +89,15 @@ class AccountConfig:
             "storage": storage_id,
         }
         if bucket_key: role["storageTargetID"] = self.instance_config[bucket_key]
+        self._add_role(role)
+
+    def _add_role(self, role):
+        # a role granted twice, e.g. publishing to the same topic for several purposes, is added once
+        if role in self.account_config["roles"]: return
         self.account_config["roles"].append(role)
 
 
+project_name = pulumi.get_project()
 stack_name = pulumi.get_stack()
 
 config = pulumi.Config()
@@ -80,12 +106,23 @@ config = pulumi.Config()
 retain_projects = config.get_bool("retainProjects", True)
 retain_resource_groups = config.get_bool("retainResourceGroups", True)
 resource_tags = config.get_object("resourceTags")
+lookup_workers = config.get_int("lookupWorkers", 16)
+lookup_cache = config.get_object("lookupCache")
+stack_state = config.get_object("stackState")
+instrumentation = config.get_object("instrumentation")
+chart_cache = config.get_object("chartCache")
+shard = config.get_object("shard")
+observability = config.get_object("observability")
+incremental = config.get_object("incremental")
+iam_binding_mode = config.get("iamBindingMode", "member")
 
 # infrastructure config
 cluster = config.get_object("cluster")
 brokers = config.get_object("brokers", {})
 storage = config.get_object("storage", {})
 accounts = {}
+autoscaling = {}
+chart_node_pools = {}
 
 # product config
 namespace = config.get("namespace", "dataphos")
@@ -96,16 +133,19 @@ deploy_persistor = config.get_bool("deployPersistor", False)
 # schema registry config
 if deploy_schema_registry:
     schema_registry_chart_config = config.get_object("dataphos-schema-registry")
+    chart_node_pools["dataphos-schema-registry"] = schema_registry_chart_config.pop("nodePool", None)
 
 # schema registry validator config
 if deploy_schema_registry_validator:
     schema_registry_validator_chart_config = config.get_object("dataphos-schema-registry-validator")
+    chart_node_pools["dataphos-schema-registry-validator"] = schema_registry_validator_chart_config.pop("nodePool", None)
     schema_registry_validator_chart_config["brokers"] = {}
 
     for instance_id, instance_config in schema_registry_validator_chart_config["validator"].items():
         # input broker config
         broker_id = instance_config["broker"]
         add_broker_config(schema_registry_validator_chart_config, broker_id)
+        add_autoscaling_config("validator", instance_id, instance_config)
 
         account = AccountConfig(instance_id, instance_config, resource_config=brokers[broker_id])
         if account.platform == PlatformID.NONE: continue
@@ -122,6 +162,7 @@ if deploy_schema_registry_validator:
 # persistor config
 if deploy_persistor:
     persistor_chart_config = config.get_object("dataphos-persistor")
+    chart_node_pools["dataphos-persistor"] = persistor_chart_config.pop("nodePool", None)
     persistor_chart_config["brokers"] = {}
     persistor_chart_config["storage"] = {}
 
@@ -138,6 +179,7 @@ if deploy_persistor:
         # input broker config
         broker_id = instance_config["broker"]
         add_broker_config(persistor_chart_config, broker_id)
+        add_autoscaling_config("persistor", instance_id, instance_config)
         account.add_broker_role(AccountRoleID.BROKER_SUBSCRIBER, AccountRoleScope.RESOURCE, broker_id, instance_config["topic"], "consumerID")
 
         # indexer broker config
@@ -153,6 +195,9 @@ if deploy_persistor:
             idx_broker_id = idx_broker_id if indexer_ref else None
             dl_broker_id = idx_broker_id or instance_config.get("deadletterBroker")
             account.add_broker_role(AccountRoleID.BROKER_PUBLISHER, AccountRoleScope.RESOURCE, dl_broker_id, dl_topic)
+            # existing subscriptions are left unchanged unless the instance opts in
+            if instance_config.get("deadLetterPolicy", False) is True:
+                add_dead_letter_policy(broker_id, instance_config["topic"], instance_config["consumerID"], dl_broker_id, dl_topic)
 
     # indexer config
     indexer_config = persistor_chart_config.get("indexer")
@@ -161,6 +206,7 @@ if deploy_persistor:
             # broker config
             broker_id = instance_config["broker"]
             add_broker_config(persistor_chart_config, broker_id)
+            add_autoscaling_config("indexer", instance_id, instance_config)
 
             account = AccountConfig(instance_id, instance_config, resource_config=brokers[broker_id])
             if account.platform == PlatformID.NONE: continue
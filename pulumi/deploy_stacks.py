@@ -0,0 +1,165 @@
+# Copyright 2024 Syntio Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import runpy
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+PROGRAM_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_NAME = "dataphos"
+COMMANDS = ["preview", "up", "refresh"]
+
+
+def get_local_stacks() -> list[str]:
+    # Stacks with a Pulumi.<stack>.yaml config file next to the program
+    return sorted(os.path.basename(path)[len("Pulumi."):-len(".yaml")] for path in glob.glob(os.path.join(PROGRAM_DIR, "Pulumi.*.yaml")))
+
+
+def _unload_program_modules():
+    # The program keeps its config and resource caches in module state, every run imports it again
+    for module_name, module in list(sys.modules.items()):
+        module_file = os.path.abspath(getattr(module, "__file__", None) or os.sep)
+        if module_file.startswith(PROGRAM_DIR + os.sep) and module_file != os.path.abspath(__file__):
+            del sys.modules[module_name]
+
+
+def run_program():
+    _unload_program_modules()
+    runpy.run_path(os.path.join(PROGRAM_DIR, "__main__.py"), run_name="__main__")
+
+
+def _get_changes(result, command: str) -> dict:
+    if command == "preview":
+        return dict(result.change_summary or {})
+    return dict(result.summary.resource_changes or {})
+
+
+def run_stack(stack_name: str, commands: list[str], progress_queue) -> dict:
+    # Runs in a worker process of its own, so stacks never share the program's module state
+    from pulumi import automation
+
+    os.chdir(PROGRAM_DIR)
+    sys.path.insert(0, PROGRAM_DIR)
+
+    def on_output(line: str):
+        progress_queue.put((stack_name, line))
+
+    result = {"stack": stack_name, "commands": {}, "error": None}
+    start_time = time.perf_counter()
+    try:
+        stack = automation.create_or_select_stack(
+            stack_name,
+            project_name=PROJECT_NAME,
+            program=run_program,
+            opts=automation.LocalWorkspaceOptions(work_dir=PROGRAM_DIR),
+        )
+        for command in commands:
+            command_start_time = time.perf_counter()
+            command_result = getattr(stack, command)(on_output=on_output)
+            result["commands"][command] = {
+                "wallTime": round(time.perf_counter() - command_start_time, 3),
+                "changes": _get_changes(command_result, command),
+            }
+            if command == "up" and "deploymentMetrics" in command_result.outputs:
+                result["commands"][command]["deploymentMetrics"] = command_result.outputs["deploymentMetrics"].value
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {str(e).strip().splitlines()[-1] if str(e).strip() else ''}"
+    result["wallTime"] = round(time.perf_counter() - start_time, 3)
+    return result
+
+
+def _print_progress(progress_queue, stack_width: int):
+    while True:
+        item = progress_queue.get()
+        if item is None: return
+        stack_name, line = item
+        print(f"[{stack_name:<{stack_width}}] {line.rstrip()}", flush=True)
+
+
+def run_stacks(stack_names: list[str], commands: list[str], parallelism: int) -> list[dict]:
+    mp_context = multiprocessing.get_context("spawn")
+    with mp_context.Manager() as manager:
+        progress_queue = manager.Queue()
+        printer = threading.Thread(target=_print_progress, args=(progress_queue, max(map(len, stack_names))), daemon=True)
+        printer.start()
+
+        results = {}
+        # a worker process runs a single stack and is replaced afterwards
+        with ProcessPoolExecutor(max_workers=parallelism, mp_context=mp_context, max_tasks_per_child=1) as executor:
+            futures = {executor.submit(run_stack, stack_name, commands, progress_queue): stack_name for stack_name in stack_names}
+            for future in as_completed(futures):
+                stack_name = futures[future]
+                try:
+                    results[stack_name] = future.result()
+                except Exception as e:
+                    results[stack_name] = {"stack": stack_name, "commands": {}, "error": f"{type(e).__name__}: {e}"}
+
+        progress_queue.put(None)
+        printer.join()
+    return [results[stack_name] for stack_name in stack_names]
+
+
+def _format_changes(changes: dict) -> str:
+    return ", ".join(f"{action} {count}" for action, count in sorted(changes.items()) if action != "same") or "no changes"
+
+
+def print_report(results: list[dict], commands: list[str]):
+    header = f"{'stack':<40}" + "".join(f"{command + ' (s)':>14}" for command in commands) + f"{'total (s)':>12}  result"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        command_times = "".join(f"{result['commands'].get(command, {}).get('wallTime', '-'):>14}" for command in commands)
+        last_command = next((command for command in reversed(commands) if command in result["commands"]), None)
+        outcome = result["error"] or (_format_changes(result["commands"][last_command]["changes"]) if last_command else "")
+        print(f"{result['stack']:<40}{command_times}{result['wallTime']:>12}  {outcome}")
+    failed = [result["stack"] for result in results if result["error"]]
+    print(f"\n{len(results) - len(failed)} of {len(results)} stacks succeeded" + (f", failed: {', '.join(failed)}" if failed else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Dataphos Pulumi program for many stacks in parallel with the Pulumi Automation API.")
+    parser.add_argument("stacks", nargs="*", help="stacks to run (default: every stack with a Pulumi.<stack>.yaml file next to the program)")
+    parser.add_argument("--command", action="append", choices=COMMANDS, help="command to run on every stack, can be repeated to run several in order (default: preview)")
+    parser.add_argument("--parallel", type=int, default=4, help="maximum number of stacks run at the same time")
+    parser.add_argument("--output", help="write the report to a JSON file")
+    args = parser.parse_args()
+
+    stack_names = args.stacks or get_local_stacks()
+    if not stack_names:
+        parser.error(f"no stacks given and no Pulumi.<stack>.yaml files found in {PROGRAM_DIR}")
+    commands = args.command or ["preview"]
+
+    start_time = time.perf_counter()
+    results = run_stacks(stack_names, commands, max(1, args.parallel))
+    wall_time = round(time.perf_counter() - start_time, 3)
+
+    print()
+    print_report(results, commands)
+    print(f"Total wall time: {wall_time}s")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"wallTime": wall_time, "commands": commands, "stacks": results}, f, indent=2)
+
+    sys.exit(1 if any(result["error"] for result in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
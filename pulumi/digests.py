@@ -0,0 +1,97 @@
+# Copyright 2024 Syntio Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+
+import pulumi
+from pulumi import Output, Resource
+
+import config
+from infrastructure.ResourceCreator import ResourceCreator
+from infrastructure.StackState import StackState
+
+DIGESTS_OUTPUT = "configDigests"
+
+incremental_properties = {
+    "enabled": True,
+    # URNs of the components whose config changed are written to this file, one per line
+    "targetsFile": "targets.txt",
+    # output of `pulumi stack export --file <stateFile>`, used when stackState is not configured
+    "stateFile": None,
+}
+
+_components = {}
+
+
+def get_digest(component_config) -> str:
+    # Outputs and other non-serializable values are hashed by their type only, their changes are found through dependencies
+    serialized = json.dumps(component_config, sort_keys=True, default=lambda value: type(value).__name__)
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
+def register(component: str, component_config, *resources: Resource):
+    # A component is one broker, storage, account or chart together with the resources rooted in it
+    if not config.incremental: return
+    _components[component] = {
+        "digest": get_digest(component_config),
+        "urns": [resource.urn for resource in resources if resource is not None],
+    }
+
+
+def get_changed_components(previous_digests: dict) -> set[str]:
+    changed = {component for component, digest in _components.items() if previous_digests.get(component, {}).get("digest") != digest["digest"]}
+    # removed components are targeted through the URNs recorded by the previous update
+    changed.update(component for component in previous_digests if component not in _components)
+    return changed
+
+
+def _get_previous_digests(incremental_config: dict) -> dict:
+    stack_state = ResourceCreator.get_stack_state()
+    if not stack_state.enabled:
+        stack_state = StackState({"file": incremental_config["stateFile"]}, config.project_name, config.stack_name)
+    if not stack_state.enabled:
+        return None
+    return stack_state.outputs.get(DIGESTS_OUTPUT) or None
+
+
+def _write_targets(targets_file: str, changed: set[str], previous_digests: dict, urns: list[str]):
+    current_urns = dict(zip(_components, urns))
+    targets = []
+    for component in sorted(changed):
+        targets.extend(current_urns.get(component) or previous_digests.get(component, {}).get("urns", []))
+    with open(targets_file, "w") as f:
+        f.writelines(f"{urn}\n" for urn in dict.fromkeys(targets))
+
+
+def export_digests():
+    if not config.incremental: return
+    incremental_config = {**incremental_properties, **config.incremental}
+    if incremental_config["enabled"] is not True: return
+
+    previous_digests = _get_previous_digests(incremental_config)
+    if previous_digests is None:
+        # without the digests of the previous update every component is treated as changed
+        pulumi.log.warn(f"No config digests of the previous update of stack <{config.stack_name}>, a full update is required")
+        previous_digests = {}
+    changed = get_changed_components(previous_digests)
+    pulumi.log.info(f"{len(changed)} of {len(_components)} components changed: {', '.join(sorted(changed)) or 'none'}")
+
+    pulumi.export(DIGESTS_OUTPUT, {
+        component: {"digest": digest["digest"], "urns": digest["urns"]}
+        for component, digest in _components.items()
+    })
+    if incremental_config["targetsFile"]:
+        Output.all(*[Output.all(*digest["urns"]) for digest in _components.values()]).apply(
+            lambda urns: _write_targets(incremental_config["targetsFile"], changed, previous_digests, urns))
@@ -0,0 +1,91 @@
+# Copyright 2024 Syntio Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import os
+
+from pulumi import log
+
+
+class ChartRenderCache:
+    CACHE_VERSION = 1
+
+    def __init__(self, cache_config: dict):
+        cache_config = cache_config or {}
+        self._path = cache_config.get("path", ".chart-cache")
+        self._chart_hashes = {}
+
+        self.enabled = bool(cache_config) and cache_config.get("enabled", True) is True
+
+    def get_key(self, chart_path: str, chart_options: str, provider_version: str) -> str:
+        # Rendered manifests only depend on the chart files, the rendering options with the values, and the provider version
+        if not self.enabled: return None
+
+        chart_hash = self._get_chart_hash(chart_path)
+        if chart_hash is None: return None
+
+        key_hash = hashlib.sha256()
+        for part in (str(ChartRenderCache.CACHE_VERSION), chart_hash, chart_options, provider_version or ""):
+            key_hash.update(part.encode())
+            key_hash.update(b"\0")
+        return key_hash.hexdigest()
+
+    def get(self, key: str) -> list[dict]:
+        if not self.enabled or key is None: return None
+
+        try:
+            with open(self._get_file_path(key)) as cache_file:
+                return json.load(cache_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            log.warn(f"Ignoring unreadable chart render cache entry <{key}>: {e}")
+            return None
+
+    def put(self, key: str, objects: list[dict]) -> None:
+        if not self.enabled or key is None: return
+
+        os.makedirs(self._path, exist_ok=True)
+        file_path = self._get_file_path(key)
+        tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as cache_file:
+            json.dump(objects, cache_file)
+        os.replace(tmp_path, file_path)
+
+    # internal methods
+    def _get_file_path(self, key: str) -> str:
+        return os.path.join(self._path, f"{key}.json")
+
+    def _get_chart_hash(self, chart_path: str) -> str:
+        chart_path = os.path.abspath(chart_path)
+        if chart_path in self._chart_hashes:
+            return self._chart_hashes[chart_path]
+
+        if not os.path.isdir(chart_path):
+            self._chart_hashes[chart_path] = None
+            return None
+
+        chart_hash = hashlib.sha256()
+        for root, dirs, files in os.walk(chart_path):
+            dirs.sort()
+            for file_name in sorted(files):
+                file_path = os.path.join(root, file_name)
+                chart_hash.update(os.path.relpath(file_path, chart_path).encode())
+                chart_hash.update(b"\0")
+                with open(file_path, "rb") as chart_file:
+                    chart_hash.update(hashlib.sha256(chart_file.read()).digest())
+
+        self._chart_hashes[chart_path] = chart_hash.hexdigest()
+        return self._chart_hashes[chart_path]
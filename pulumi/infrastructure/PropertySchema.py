@@ -0,0 +1,136 @@
+# Copyright 2024 Syntio Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def camel_case_to_snake_case(s: str) -> str:
+    return ''.join(['_'+i.lower() if i.isupper() else i for i in s]).lstrip('_')
+
+
+def dict_list_to_snake_case(original: list[dict]) -> list[dict]:
+    return [{camel_case_to_snake_case(key): value for key, value in config_map.items()} for config_map in original]
+
+
+class ResourceConfigProperties:
+    __slots__ = ("user_config", "retrieved_data", "configuration_updated")
+
+
+class PropertySchema:
+    _compiled_schemas = {}
+
+    def __init__(self, resource_properties: dict):
+        # Snake case names, nested keys and defaults are resolved once per schema
+        # if creating a new resource, resource_data will be empty and default value will be used
+        # if importing or updating a resource, default values will be ignored
+        self._resolvers = []
+        for config_key, config_value in resource_properties.items():
+            variable_name = camel_case_to_snake_case(config_key)
+            if type(config_value) is dict:
+                nested_keys = PropertySchema._compile_nested_keys(config_value)
+                self._resolvers.append((self._resolve_dict, config_key, variable_name, nested_keys))
+            elif type(config_value) is list and type(config_value[0]) is dict:
+                nested_keys = PropertySchema._compile_nested_keys(config_value[0]) if len(config_value) == 1 else None
+                self._resolvers.append((self._resolve_list, config_key, variable_name, (nested_keys, dict_list_to_snake_case(config_value))))
+            else:
+                self._resolvers.append((self._resolve_value, config_key, variable_name, config_value))
+
+        slots = tuple(variable_name for _, _, variable_name, _ in self._resolvers)
+        self.properties_class = type("ConfiguredResourceProperties", (ResourceConfigProperties,), {"__slots__": slots})
+
+    @staticmethod
+    def get(resource_properties: dict) -> "PropertySchema":
+        # Schemas are module level constants, the schema object is kept so its id cannot be reused
+        compiled = PropertySchema._compiled_schemas.get(id(resource_properties))
+        if compiled is None or compiled[0] is not resource_properties:
+            compiled = (resource_properties, PropertySchema(resource_properties))
+            PropertySchema._compiled_schemas[id(resource_properties)] = compiled
+        return compiled[1]
+
+    @staticmethod
+    def _compile_nested_keys(system_default: dict) -> tuple:
+        return tuple((nested_key, camel_case_to_snake_case(nested_key), nested_default) for nested_key, nested_default in system_default.items())
+
+    def configure(self, user_config: dict, retrieved_data) -> ResourceConfigProperties:
+        resource_config = self.properties_class()
+        resource_config.user_config = user_config
+        resource_config.retrieved_data = retrieved_data
+        resource_config.configuration_updated = False
+        for resolve, config_key, variable_name, plan in self._resolvers:
+            if resolve(resource_config, config_key, variable_name, plan):
+                resource_config.configuration_updated = True
+        return resource_config
+
+    # resolvers
+    @staticmethod
+    def _resolve_value(resource_config: ResourceConfigProperties, config_key: str, variable_name: str, system_default) -> bool:
+        retrieved_data = resource_config.retrieved_data
+        default_value = getattr(retrieved_data, variable_name) if retrieved_data else system_default
+        value = resource_config.user_config.get(config_key, default_value)
+        setattr(resource_config, variable_name, value)
+        return retrieved_data is not None and value != default_value
+
+    @staticmethod
+    def _resolve_nested(retrieved_data, retrieved_dict: dict, user_dict: dict, nested_keys: tuple) -> tuple[dict, bool]:
+        resolved = {}
+        value_changed = False
+        for nested_key, key_name, nested_default in nested_keys:
+            retrieved_value = retrieved_dict.get(key_name) if retrieved_dict else None
+            default_value = retrieved_value if retrieved_data else nested_default
+
+            value = user_dict.get(nested_key, default_value)
+            resolved[key_name] = value
+
+            if not value_changed:
+                value_changed = value != default_value
+        return resolved, value_changed
+
+    @staticmethod
+    def _resolve_dict(resource_config: ResourceConfigProperties, config_key: str, variable_name: str, nested_keys: tuple) -> bool:
+        retrieved_data = resource_config.retrieved_data
+        retrieved_dict = getattr(retrieved_data, variable_name) if retrieved_data else None
+        user_dict = resource_config.user_config.get(config_key) or {}
+
+        if retrieved_data and not retrieved_dict and not user_dict:
+            setattr(resource_config, variable_name, retrieved_dict)
+            return False
+
+        value, value_changed = PropertySchema._resolve_nested(retrieved_data, retrieved_dict, user_dict, nested_keys)
+        setattr(resource_config, variable_name, value)
+        return retrieved_data is not None and value_changed
+
+    @staticmethod
+    def _resolve_list(resource_config: ResourceConfigProperties, config_key: str, variable_name: str, plan: tuple) -> bool:
+        nested_keys, snake_case_default = plan
+        retrieved_data = resource_config.retrieved_data
+        retrieved_list = getattr(retrieved_data, variable_name) if retrieved_data else None
+        user_config = resource_config.user_config
+        user_list = user_config.get(config_key, [{}])
+
+        if retrieved_data and not retrieved_list and not user_list:
+            setattr(resource_config, variable_name, retrieved_list)
+            return False
+
+        # special case of a single-element dictionary list
+        if not (user_list and len(user_list) > 1) and not (retrieved_list and len(retrieved_list) > 1) and nested_keys is not None:
+            retrieved_dict = retrieved_list[0] if retrieved_list else None
+            value, value_changed = PropertySchema._resolve_nested(retrieved_data, retrieved_dict, user_list[0], nested_keys)
+            setattr(resource_config, variable_name, [value])
+        else:
+            if config_key in user_config:
+                user_config[config_key] = dict_list_to_snake_case(user_list)
+            system_default = [dict(item) for item in snake_case_default]
+            value_changed = PropertySchema._resolve_value(resource_config, config_key, variable_name, system_default)
+        return retrieved_data is not None and value_changed
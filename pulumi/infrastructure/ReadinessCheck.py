@@ -0,0 +1,110 @@
+# Copyright 2024 Syntio Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from pulumi import Input, Output, ResourceOptions
+from pulumi.dynamic import CreateResult, DiffResult, Resource, ResourceProvider, UpdateResult
+
+
+class ReadinessProvider(ResourceProvider):
+    # Polls a Kubernetes object with kubectl until its status condition is true, runs in the dynamic provider process
+
+    def create(self, props: dict) -> CreateResult:
+        return CreateResult(id_=f"{props['namespace']}/{props['resource']}/{props['objectName']}", outs={**props, **self._wait(props)})
+
+    def diff(self, id_: str, olds: dict, news: dict) -> DiffResult:
+        changed = [key for key in ("resource", "objectName", "namespace", "condition", "trigger") if olds.get(key) != news.get(key)]
+        return DiffResult(changes=bool(changed), replaces=[], delete_before_replace=False)
+
+    def update(self, id_: str, olds: dict, news: dict) -> UpdateResult:
+        return UpdateResult(outs={**news, **self._wait(news)})
+
+    def _wait(self, props: dict) -> dict:
+        start_time = time.monotonic()
+        last_status = None
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            command = ["kubectl", "get", props["resource"], props["objectName"], "--namespace", props["namespace"], "--output", "json"]
+            if props.get("kubeconfig"):
+                kubeconfig_file = os.path.join(tmp_dir, "kubeconfig")
+                with open(kubeconfig_file, "w") as f:
+                    f.write(props["kubeconfig"])
+                command.extend(["--kubeconfig", kubeconfig_file])
+
+            while True:
+                process = subprocess.run(command, capture_output=True, text=True)
+                # the object is created by an operator and may not exist yet
+                obj = json.loads(process.stdout) if process.returncode == 0 else None
+                ready, status = self._get_status(obj, props) if obj else (False, process.stderr.strip() or "not found")
+
+                if status != last_status:
+                    print(f"{props['resource']}/{props['objectName']}: {status}", file=sys.stderr, flush=True)
+                    last_status = status
+                if ready:
+                    return {"lastStatus": status, "waitedSeconds": round(time.monotonic() - start_time)}
+                if time.monotonic() - start_time > props["timeout"]:
+                    raise Exception(f"{props['resource']}/{props['objectName']} in namespace {props['namespace']} was not ready after {props['timeout']}s: {status}")
+                time.sleep(props["pollInterval"])
+
+    @staticmethod
+    def _get_status(obj: dict, props: dict) -> tuple[bool, str]:
+        status = obj.get("status") or {}
+        conditions = status.get("conditions") or []
+        for condition in conditions:
+            failure = props["failureConditions"].get(condition.get("type"))
+            if failure is None or condition.get("status") != failure["status"]: continue
+            if not failure.get("reasons") or condition.get("reason") in failure["reasons"]:
+                # error conditions are not retried until the timeout
+                raise Exception(f"{props['resource']}/{props['objectName']} in namespace {props['namespace']} failed: {condition.get('type')} {condition.get('reason')}: {condition.get('message')}")
+
+        # conditions of an older generation are stale
+        observed_generation = status.get("observedGeneration")
+        if observed_generation is not None and observed_generation < obj.get("metadata", {}).get("generation", 0):
+            return False, f"waiting for generation {obj['metadata']['generation']} to be observed"
+
+        summary = ", ".join(f"{condition.get('type')}={condition.get('status')}" + (f" ({condition['reason']})" if condition.get("reason") else "") for condition in conditions)
+        ready = any(condition.get("type") == props["condition"] and condition.get("status") == "True" for condition in conditions)
+        if ready and "replicas" in (obj.get("spec") or {}):
+            ready = status.get("updatedReplicas", 0) >= obj["spec"]["replicas"] and status.get("availableReplicas", 0) >= obj["spec"]["replicas"]
+        return ready, summary or "no conditions reported"
+
+
+class ReadinessCheck(Resource):
+    # Completes once the status condition of a Kubernetes object is true, dependents are released right after
+    last_status: Output[str]
+    waited_seconds: Output[int]
+
+    def __init__(self, name: str, resource: str, object_name: Input[str], namespace: Input[str], condition: str,
+                 failure_conditions: dict, timeout: int, poll_interval: int, kubeconfig: Input[str] = None,
+                 trigger: Input = None, opts: ResourceOptions = None):
+        props = {
+            "resource": resource,
+            "objectName": object_name,
+            "namespace": namespace,
+            "condition": condition,
+            "failureConditions": failure_conditions,
+            "timeout": timeout,
+            "pollInterval": poll_interval,
+            "kubeconfig": Output.secret(kubeconfig) if kubeconfig is not None else None,
+            # a changed trigger, e.g. the spec of the object, waits for the condition again
+            "trigger": trigger,
+            "lastStatus": None,
+            "waitedSeconds": None,
+        }
+        super().__init__(ReadinessProvider(), name, props, opts)
@@ -0,0 +1,80 @@
+# Copyright 2024 Syntio Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pulumi
+from pulumi import ComponentResource, InvokeOptions, Output, ResourceOptions
+from pulumi_kubernetes import _utilities
+from pulumi_kubernetes.helm.v3 import LocalChartOpts
+from pulumi_kubernetes.helm.v3.helm import _skip_await
+from pulumi_kubernetes.yaml.yaml import _parse_yaml_document
+
+from infrastructure.ChartRenderCache import ChartRenderCache
+import config
+
+
+class RenderedChart(ComponentResource):
+    # Drop-in replacement for a local helm.v3.Chart
+    # The component and its children keep the Chart resource types, so existing URNs are preserved
+    _render_cache: ChartRenderCache = None
+
+    def __init__(self, release_name: str, config: LocalChartOpts, opts: ResourceOptions = None):
+        opts = opts or ResourceOptions()
+        if config.resource_prefix:
+            release_name = f"{config.resource_prefix}-{release_name}"
+
+        alias_opts = ResourceOptions(aliases=[pulumi.Alias(type_="kubernetes:helm.sh/v2:Chart")])
+        super().__init__("kubernetes:helm.sh/v3:Chart", release_name, {}, ResourceOptions.merge(opts, alias_opts))
+
+        config.release_name = release_name
+        self._chart_path = config.path
+        self._provider_version = opts.version or _utilities.get_version()
+        self._invoke_opts = InvokeOptions(version=self._provider_version, parent=opts.parent, provider=opts.provider)
+
+        transformations = list(config.transformations or [])
+        if config.skip_await:
+            transformations.append(_skip_await)
+
+        chart_options = config.to_json()
+        objects = chart_options.apply(lambda options: self._render(options, chart_options))
+        self.resources = objects.apply(lambda x: _parse_yaml_document(x, ResourceOptions(parent=self), transformations))
+        self.register_outputs({"resources": self.resources})
+        self.ready = self.resources.apply(lambda x: list(x.values()))
+
+    @staticmethod
+    def _get_render_cache() -> ChartRenderCache:
+        if RenderedChart._render_cache is None:
+            RenderedChart._render_cache = ChartRenderCache(config.chart_cache)
+        return RenderedChart._render_cache
+
+    async def _render(self, options: str, chart_options: Output) -> list[dict]:
+        # Renders run as awaitables on the event loop, so independent charts are rendered concurrently
+        render_cache = RenderedChart._get_render_cache()
+        cache_key = render_cache.get_key(self._chart_path, options, self._provider_version)
+        objects = render_cache.get(cache_key)
+        if objects is not None:
+            return objects
+
+        invoke_async = getattr(pulumi.runtime, "invoke_async", None)
+        if invoke_async:
+            result = await invoke_async("kubernetes:helm:template", {"jsonOpts": options}, self._invoke_opts)
+        else:
+            invoke_result = pulumi.runtime.invoke("kubernetes:helm:template", {"jsonOpts": options}, self._invoke_opts)
+            result = invoke_result.value if invoke_result is not None else None
+        objects = result["result"] if result is not None and result.get("result") is not None else []
+
+        # rendered secrets and secret values are never written to disk
+        contains_secrets = await chart_options.is_secret() or any(obj and obj.get("kind") == "Secret" for obj in objects)
+        if not contains_secrets:
+            render_cache.put(cache_key, objects)
+        return objects
@@ -0,0 +1,46 @@
+# Copyright 2024 Syntio Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import copy
+import os
+from typing import Callable, Optional, Sequence
+
+import yaml
+from pulumi import ComponentResource, ResourceOptions
+from pulumi_kubernetes.yaml.yaml import _parse_yaml_document
+
+
+class RenderedConfigFile(ComponentResource):
+    # Drop-in replacement for a yaml.ConfigFile, the file is read and parsed once per deployment
+    # The component and its children keep the ConfigFile resource types, so existing URNs are preserved
+    _templates = {}
+
+    def __init__(self, name: str, file: str, transformations: Optional[Sequence[Callable]] = None, opts: ResourceOptions = None):
+        super().__init__("kubernetes:yaml:ConfigFile", name, {}, opts)
+
+        # every config file transforms its own copy of the parsed objects
+        objects = copy.deepcopy(RenderedConfigFile._load(file))
+        # like a ConfigFile, the children inherit the options of the component, e.g. retain_on_delete and depends_on
+        child_opts = ResourceOptions.merge(opts, ResourceOptions(parent=self))
+        self.resources = _parse_yaml_document(objects, child_opts, transformations)
+        self.register_outputs({"resources": self.resources})
+        self.ready = self.resources.apply(lambda x: list(x.values()))
+
+    @staticmethod
+    def _load(file: str) -> list[dict]:
+        path = os.path.abspath(file)
+        if path not in RenderedConfigFile._templates:
+            with open(path) as f:
+                RenderedConfigFile._templates[path] = list(yaml.safe_load_all(f))
+        return RenderedConfigFile._templates[path]
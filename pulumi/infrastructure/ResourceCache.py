@@ -0,0 +1,110 @@
+# Copyright 2024 Syntio Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import atexit
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+from pulumi import log, runtime
+
+
+class ResourceCache:
+    CACHE_VERSION = 1
+
+    def __init__(self, cache_config: dict, project_name: str, stack_name: str):
+        cache_config = cache_config or {}
+        self._ttl = cache_config.get("ttl", 3600)
+        self._refresh = cache_config.get("refresh", False) is True
+        self._path = os.path.join(cache_config.get("path", ".lookup-cache"), f"{project_name}.{stack_name}.json")
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._updated = False
+
+        self.enabled = bool(cache_config) and cache_config.get("enabled", True) is True
+        if not self.enabled: return
+
+        if not runtime.is_dry_run():
+            # An update creates and imports the resources that were looked up, so cached results become stale
+            self._remove_cache_file()
+            self.enabled = False
+            return
+
+        if not self._refresh:
+            self._entries = self._load_entries()
+        atexit.register(self.save)
+
+    def get(self, resource_key: str) -> tuple[bool, object]:
+        if not self.enabled: return False, None
+
+        entry = self._entries.get(resource_key)
+        if entry is None or self._is_expired(entry):
+            return False, None
+
+        data = entry["data"]
+        return True, SimpleNamespace(**data) if data is not None else None
+
+    def put(self, resource_key: str, resource_data) -> None:
+        if not self.enabled: return
+
+        data = vars(resource_data) if resource_data is not None else None
+        try:
+            json.dumps(data)
+        except (TypeError, ValueError):
+            # results that cannot be stored are looked up again on the next run
+            return
+
+        with self._lock:
+            self._entries[resource_key] = {"time": time.time(), "data": data}
+            self._updated = True
+
+    def save(self) -> None:
+        if not self.enabled or not self._updated: return
+
+        with self._lock:
+            entries = {key: entry for key, entry in self._entries.items() if not self._is_expired(entry)}
+            self._updated = False
+
+        os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+        tmp_path = f"{self._path}.tmp"
+        # retrieved data can contain sensitive resource properties
+        with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as cache_file:
+            json.dump({"version": ResourceCache.CACHE_VERSION, "entries": entries}, cache_file)
+        os.replace(tmp_path, self._path)
+
+    # internal methods
+    def _is_expired(self, entry: dict) -> bool:
+        return self._ttl > 0 and time.time() - entry["time"] > self._ttl
+
+    def _load_entries(self) -> dict:
+        try:
+            with open(self._path) as cache_file:
+                cache = json.load(cache_file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            log.warn(f"Ignoring unreadable lookup cache <{self._path}>: {e}")
+            return {}
+
+        if cache.get("version") != ResourceCache.CACHE_VERSION:
+            return {}
+        return cache.get("entries", {})
+
+    def _remove_cache_file(self) -> None:
+        try:
+            os.remove(self._path)
+        except FileNotFoundError:
+            pass
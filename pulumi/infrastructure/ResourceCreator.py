@@ -12,114 +12,182 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from types import SimpleNamespace
 from typing import Callable, Any
 
-from pulumi import ResourceOptions
+from pulumi import ResourceOptions, log
+
+from infrastructure.PropertySchema import PropertySchema, ResourceConfigProperties, camel_case_to_snake_case, dict_list_to_snake_case
+from infrastructure.ResourceCache import ResourceCache
+from infrastructure.StackState import StackState
+import config
+import instrumentation
 
 
 class ResourceCreator:
-    class ResourceConfigProperties:
-
-        def __init__(self, user_config: dict, resource_data):
-            self.user_config = user_config
-            self.retrieved_data = resource_data
-            self.configuration_updated = False
-
-        # if creating a new resource, resource_data will be empty and default value will be used
-        # if importing or updating a resource, default values will be ignored
-        def set_property(self, config_key: str, system_default) -> bool:
-            variable_name = ResourceCreator.camel_case_to_snake_case(config_key)
-
-            default_value = getattr(self.retrieved_data, variable_name) if self.retrieved_data else system_default
-            value = self.user_config.get(config_key, default_value)
-            setattr(self, variable_name, value)
-            return self.retrieved_data is not None and value != default_value
-
-        def set_dict_property(self, config_key: str, system_default: dict) -> bool:
-            variable_name = ResourceCreator.camel_case_to_snake_case(config_key)
-            retrieved_dict = getattr(self.retrieved_data, variable_name) if self.retrieved_data else None
-            user_dict = self.user_config.get(config_key, {})
-
-            if self.retrieved_data and not retrieved_dict and not user_dict:
-                setattr(self, variable_name, retrieved_dict)
-                return False
-
-            setattr(self, variable_name, {})
-            value_changed = False
-            for nested_key in system_default:
-                key_name = ResourceCreator.camel_case_to_snake_case(nested_key)
-                retrieved_value = retrieved_dict.get(key_name) if retrieved_dict else None
-                default_value = retrieved_value if self.retrieved_data else system_default[nested_key]
-
-                value = user_dict.get(nested_key, default_value)
-                getattr(self, variable_name)[key_name] = value
-
-                if not value_changed:
-                    value_changed = value != default_value
-            return self.retrieved_data is not None and value_changed
-
-        def set_list_property(self, config_key: str, system_default: list[dict]) -> bool:
-            variable_name = ResourceCreator.camel_case_to_snake_case(config_key)
-            retrieved_list = getattr(self.retrieved_data, variable_name) if self.retrieved_data else None
-            user_list = self.user_config.get(config_key, [{}])
-
-            if self.retrieved_data and not retrieved_list and not user_list:
-                setattr(self, variable_name, retrieved_list)
-                return False
-
-            value_changed = False
-            # special case of a single-element dictionary list
-            if not (user_list and len(user_list) > 1) and not (retrieved_list and len(retrieved_list) > 1) and len(system_default) == 1:
-                setattr(self, variable_name, [{}])
-                for nested_key in system_default[0]:
-                    key_name = ResourceCreator.camel_case_to_snake_case(nested_key)
-                    retrieved_value = retrieved_list[0].get(key_name) if retrieved_list else None
-                    default_value = retrieved_value if self.retrieved_data else system_default[0][nested_key]
-
-                    value = user_list[0].get(nested_key, default_value)
-                    getattr(self, variable_name)[0][key_name] = value
-
-                    if not value_changed:
-                        value_changed = value != default_value
-            else:
-                if config_key in self.user_config:
-                    self.user_config[config_key] = ResourceCreator.dict_list_to_snake_case(user_list)
-                system_default = ResourceCreator.dict_list_to_snake_case(system_default)
-                value_changed = self.set_property(config_key, system_default)
-            return self.retrieved_data is not None and value_changed
+    # user defined maps whose keys are kept as they are
+    MAP_PROPERTIES = ["labels", "tags", "metadata", "resourceLabels"]
+    _lookup_cache: ResourceCache = None
+    _stack_state: StackState = None
+
+    ResourceConfigProperties = ResourceConfigProperties
+
+    def __init__(self):
+        # results of concurrent lookups, taken by lookup_resource
+        self._retrieved_resources = {}
 
     @staticmethod
     def camel_case_to_snake_case(s: str) -> str:
-        return ''.join(['_'+i.lower() if i.isupper() else i for i in s]).lstrip('_')
+        return camel_case_to_snake_case(s)
 
     @staticmethod
     def dict_list_to_snake_case(original: list[dict]) -> list[dict]:
-        new = []
-        for config_map in original:
-            d = {}
-            for key, value in config_map.items():
-                new_key = ResourceCreator.camel_case_to_snake_case(key)
-                d[new_key] = value
-            new.append(d)
-        return new
-
-    def _configure_resource(self, config_properties: dict, user_config: dict, retrieved_data):
-        resource_config = ResourceCreator.ResourceConfigProperties(user_config, retrieved_data)
-        for config_key, config_value in config_properties.items():
-            if type(config_value) is dict:
-                value_updated = resource_config.set_dict_property(config_key, system_default=config_value)
-            elif type(config_value) is list and type(config_value[0]) is dict:
-                value_updated = resource_config.set_list_property(config_key, system_default=config_value)
-            else:
-                value_updated = resource_config.set_property(config_key, system_default=config_value)
+        return dict_list_to_snake_case(original)
+
+    @staticmethod
+    def resource_key(resource_type: str, resource_name: str) -> str:
+        return f"{resource_type}::{resource_name}"
+
+    @staticmethod
+    def _get_lookup_cache() -> ResourceCache:
+        if ResourceCreator._lookup_cache is None:
+            ResourceCreator._lookup_cache = ResourceCache(config.lookup_cache, config.project_name, config.stack_name)
+        return ResourceCreator._lookup_cache
 
-            if not resource_config.configuration_updated and value_updated:
-                resource_config.configuration_updated = True
-        return resource_config
+    @staticmethod
+    def get_stack_state() -> StackState:
+        if ResourceCreator._stack_state is None:
+            ResourceCreator._stack_state = StackState(config.stack_state, config.project_name, config.stack_name)
+        return ResourceCreator._stack_state
+
+    @staticmethod
+    def _snake_case_keys(value):
+        if type(value) is list:
+            return [ResourceCreator._snake_case_keys(item) for item in value]
+        if type(value) is dict:
+            return {
+                ResourceCreator.camel_case_to_snake_case(key): item if key in ResourceCreator.MAP_PROPERTIES else ResourceCreator._snake_case_keys(item)
+                for key, item in value.items()
+            }
+        return value
+
+    @staticmethod
+    def _managed_resource_data(managed_resource: StackState.ManagedResource, resource_properties: dict) -> SimpleNamespace:
+        # Shape the outputs stored in the stack state like the result of the provider's get function
+        resource_data = {ResourceCreator.camel_case_to_snake_case(key): value for key, value in managed_resource.outputs.items()}
+        for config_key, config_value in resource_properties.items():
+            is_dict_list = type(config_value) is list and type(config_value[0]) is dict
+            value = managed_resource.get_output(config_key, is_dict_list)
+            if is_dict_list and type(value) is dict:
+                # get functions return nested blocks as lists, while resources store them as objects
+                value = [value]
+            if type(config_value) is dict or is_dict_list:
+                value = ResourceCreator._snake_case_keys(value)
+            resource_data[ResourceCreator.camel_case_to_snake_case(config_key)] = value
+        resource_data["id"] = managed_resource.id
+        return SimpleNamespace(**resource_data)
+
+    @staticmethod
+    def _cached_lookup(resource_key: str, lookup: Callable[[], Any]):
+        start = time.time_ns()
+        resource_data = lookup()
+        instrumentation.record_lookup(resource_key, start, time.time_ns())
+        ResourceCreator._get_lookup_cache().put(resource_key, resource_data)
+        return resource_data
+
+    @staticmethod
+    def _run_lookup(lookup: Callable[[], Any]):
+        # Synchronous invokes pump the current thread's event loop, so every worker gets a short-lived loop of its own
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            return lookup()
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+
+    def _get_retrieved_resources(self) -> dict:
+        return self._retrieved_resources
+
+    def discover_resources(self, workspace_name: str, lookups: dict[str, Callable[[], Any]], discover: Callable[[], set[str]]) -> set[str]:
+        # List a workspace once and return the lookup keys of its existing resources
+        # If listing is not possible, None is returned and every resource is looked up on its own
+        stack_state = ResourceCreator.get_stack_state()
+        if all(stack_state.get(key) for key in lookups):
+            # every resource is already managed by the stack, there is nothing left to discover
+            return None
+
+        try:
+            return discover()
+        except ImportError as e:
+            log.warn(f"Resource discovery for <{workspace_name}> is not available ({e}), falling back to per-resource lookups")
+        except Exception as e:
+            log.warn(f"Resource discovery for <{workspace_name}> failed, falling back to per-resource lookups: {e}")
+        return None
+
+    def lookup_resources(self, lookups: dict[str, Callable[[], Any]], discovered_keys: set[str] = None) -> None:
+        # Run independent existence lookups concurrently and keep the results for lookup_resource
+        # Resources missing from a discovered workspace index are known not to exist and are not looked up
+        retrieved_resources = self._get_retrieved_resources()
+        stack_state = ResourceCreator.get_stack_state()
+        lookup_cache = ResourceCreator._get_lookup_cache()
+        lookup_items = []
+        for key, lookup in lookups.items():
+            managed_resource = stack_state.get(key)
+            if managed_resource:
+                instrumentation.record_lookup_source("state")
+                retrieved_resources[key] = managed_resource
+                continue
+            if discovered_keys is not None and key not in discovered_keys:
+                instrumentation.record_lookup_source("discovery")
+                retrieved_resources[key] = None
+                continue
+            found, resource_data = lookup_cache.get(key)
+            if found:
+                instrumentation.record_lookup_source("cache")
+                retrieved_resources[key] = resource_data
+                continue
+            lookup_items.append((key, partial(ResourceCreator._cached_lookup, key, lookup)))
+
+        if not lookup_items: return
+
+        # Lookups run on event loops of their own, so they must only take plain values, never Outputs of the main loop
+        max_workers = max(1, min(config.lookup_workers, len(lookup_items)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {key: executor.submit(ResourceCreator._run_lookup, lookup) for key, lookup in lookup_items}
+        for key, future in futures.items():
+            retrieved_resources[key] = future.result()
+
+    def lookup_resource(self, resource_key: str, lookup: Callable[[], Any]):
+        # Use the result of a previous concurrent or cached lookup if there is one, otherwise look the resource up now
+        # Resources that are already managed by the stack are never looked up
+        retrieved_resources = self._get_retrieved_resources()
+        if resource_key in retrieved_resources:
+            return retrieved_resources.pop(resource_key)
+
+        managed_resource = ResourceCreator.get_stack_state().get(resource_key)
+        if managed_resource:
+            instrumentation.record_lookup_source("state")
+            return managed_resource
+
+        found, resource_data = ResourceCreator._get_lookup_cache().get(resource_key)
+        if found:
+            instrumentation.record_lookup_source("cache")
+            return resource_data
+        return ResourceCreator._cached_lookup(resource_key, lookup)
+
+    def _configure_resource(self, config_properties: dict, user_config: dict, retrieved_data) -> ResourceConfigProperties:
+        return PropertySchema.get(config_properties).configure(user_config, retrieved_data)
 
     def create_or_import_resource(self, resource_name: str, resource_properties: dict, user_config: dict, retrieved_data, opts: ResourceOptions, create_resource: Callable[[str,  ResourceConfigProperties, ResourceOptions], Any]):
         # Cannot import existing resource and update its configuration in one run
         # Import the resource first, then run the script again with desired configuration
+        if isinstance(retrieved_data, StackState.ManagedResource):
+            retrieved_data = ResourceCreator._managed_resource_data(retrieved_data, resource_properties)
         resource_config = self._configure_resource(resource_properties, user_config, retrieved_data)
         opts.retain_on_delete = user_config.get("retain", False) is True
 
@@ -130,12 +198,15 @@ class ResourceCreator:
                 # resource must had been imported before it can be updated
                 # otherwise it will try creating it and deployment will fail
                 print(f"Updating existing resource <{resource_name}> configuration")
+                instrumentation.record_resource("updated")
             else:
                 # Import existing resource
                 opts.import_ = retrieved_data.id
                 print(f"Imported existing resource <{resource_name}>")
+                instrumentation.record_resource("imported")
         else:
             # Create a new resource using configured values
             print(f"Creating new resource <{resource_name}>")
+            instrumentation.record_resource("created")
 
         return create_resource(resource_name, resource_config, opts)
@@ -0,0 +1,94 @@
+# Copyright 2024 Syntio Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+
+from pulumi import log
+
+
+class StackState:
+    SECRET_SIGNATURE = "4dabf18193072939515e22adb298388d"
+
+    class ManagedResource:
+
+        def __init__(self, resource_id: str, outputs: dict):
+            self.id = resource_id
+            self.outputs = outputs
+
+        def get_output(self, config_key: str, is_list: bool):
+            if config_key in self.outputs:
+                return self.outputs[config_key]
+            if is_list and config_key.endswith("ies"):
+                return self.outputs.get(config_key[:-3] + "y")
+            if is_list and config_key.endswith("s"):
+                return self.outputs.get(config_key[:-1])
+            return None
+
+    def __init__(self, state_config: dict, project_name: str, stack_name: str):
+        state_config = state_config or {}
+        self._project_name = project_name
+        self._stack_name = stack_name
+        self._resources = {}
+        self.outputs = {}
+
+        self.enabled = bool(state_config) and state_config.get("enabled", True) is True
+        if not self.enabled: return
+
+        try:
+            deployment = self._load_deployment(state_config.get("file"))
+        except Exception as e:
+            log.warn(f"Could not read the state of stack <{stack_name}>, every resource will be looked up: {e}")
+            self.enabled = False
+            return
+        self._resources = self._index_resources(deployment)
+
+    def get(self, resource_key: str):
+        if not self.enabled: return None
+        return self._resources.get(resource_key)
+
+    # internal methods
+    def _load_deployment(self, state_file: str) -> dict:
+        if state_file:
+            # output of `pulumi stack export --file <state_file>`
+            with open(state_file) as f:
+                return json.load(f).get("deployment", {})
+
+        from pulumi import automation
+
+        workspace = automation.LocalWorkspace(work_dir=os.getcwd())
+        return workspace.export_stack(self._stack_name).deployment or {}
+
+    def _index_resources(self, deployment: dict) -> dict:
+        resources = {}
+        for resource in deployment.get("resources") or []:
+            urn = resource.get("urn", "")
+            if resource.get("type") == "pulumi:pulumi:Stack":
+                # stack outputs exported by the previous update
+                self.outputs = resource.get("outputs") or {}
+                continue
+            if not resource.get("custom") or not resource.get("id") or resource.get("delete"):
+                continue
+            if f"::{self._project_name}::" not in urn:
+                continue
+
+            outputs = resource.get("outputs") or {}
+            if any(type(value) is dict and StackState.SECRET_SIGNATURE in value for value in outputs.values()):
+                # secret outputs are encrypted in the state, such resources are looked up in the cloud
+                continue
+
+            resource_name = urn.split("::")[-1]
+            resource_key = f"{resource['type']}::{resource_name}"
+            resources[resource_key] = StackState.ManagedResource(resource["id"], outputs)
+        return resources
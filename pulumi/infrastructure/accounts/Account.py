@@ -17,8 +17,6 @@ from pulumi import ComponentResource, ResourceOptions
 from infrastructure.platform.Platform import Platform
 from infrastructure.platform.PlatformID import PlatformID
 from infrastructure.accounts.AbstractAccount import AbstractAccount
-from infrastructure.accounts.service_principal.ServicePrincipal import ServicePrincipal
-from infrastructure.accounts.service_account.ServiceAccount import ServiceAccount
 from infrastructure.broker.AbstractMessageBroker import AbstractMessageBroker
 from infrastructure.storage.AbstractStorage import AbstractStorage
 
@@ -32,10 +30,13 @@ class Account(ComponentResource, AbstractAccount):
         opts = ResourceOptions(parent=workspace)
         super().__init__(resource_type, resource_name, None, opts)
 
+        # Provider SDKs are imported only for the platforms in use
         platform = account_config["platform"]
         if platform == PlatformID.AZURE:
+            from infrastructure.accounts.service_principal.ServicePrincipal import ServicePrincipal
             self._account_instance = ServicePrincipal(app_id, parent=self)
         elif platform == PlatformID.GCP:
+            from infrastructure.accounts.service_account.ServiceAccount import ServiceAccount
             self._account_instance = ServiceAccount(app_id, project=workspace, parent=self)
 
     def add_broker_role(self, broker: AbstractMessageBroker, role_config: dict):
@@ -21,7 +21,9 @@ from infrastructure.broker.pubsub.PubSubMessageBroker import PubSubMessageBroker
 from infrastructure.storage.gcs.GoogleCloudStorage import GoogleCloudStorage
 from infrastructure.accounts.AbstractAccount import AbstractAccount
 from infrastructure.accounts.AccountRoleScope import AccountRoleScope
+from infrastructure.platform.gcp.IamBindings import IamBindings, BINDING_MODE
 import infrastructure.accounts.service_account.service_account_config as config
+from config import brokers as broker_config, storage as storage_config
 
 
 class ServiceAccount(AbstractAccount):
@@ -31,6 +33,8 @@ class ServiceAccount(AbstractAccount):
         self._service_account_id = f"{app_id}-sa"
         self._service_account, self._private_key = self._create_service_account(self._service_account_id, project.project_id)
         self._sa_email = self._service_account.email
+        self._member = Output.format("serviceAccount:{0}", self._sa_email)
+        self._members = {}
 
     # interface methods
     def add_broker_role(self, broker: PubSubMessageBroker, role_config: dict):
@@ -39,34 +43,30 @@ class ServiceAccount(AbstractAccount):
         if role_config["scope"] == AccountRoleScope.PROJECT:
             return self._add_project_role(broker, role_definition)
 
-        role_name = role_definition["name"]
-        role_id = role_definition["id"]
-
+        binding_mode = IamBindings.get_mode(broker_config[role_config["broker"]])
         topic_name = role_config["topic"]
         topic = broker.topics[topic_name]
-        opts = ResourceOptions(parent=self._service_account)
-        TopicIAMMember(
-            f"{self._app_id}-{topic_name}-{role_name}",
-            project=broker.project_id,
-            topic=topic.name,
-            role=role_id,
-            member=Output.format("serviceAccount:{0}", self._sa_email),
-            opts=opts
-        )
+        if binding_mode == BINDING_MODE:
+            IamBindings.add_member(IamBindings.TOPIC, topic, topic_name, broker.project_id, role_definition["id"], role_definition["name"], self._member)
+        else:
+            self._add_member(TopicIAMMember, f"{self._app_id}-{topic_name}-{role_definition['name']}",
+                project=broker.project_id,
+                topic=topic.name,
+                role=role_definition["id"],
+            )
 
         subscription_name = role_config.get("consumerID")
         if not subscription_name: return
 
         subscription = broker.subscriptions[topic_name][subscription_name]
-        opts = ResourceOptions(parent=self._service_account)
-        SubscriptionIAMMember(
-            f"{self._app_id}-{subscription_name}-{role_definition['name']}",
-            project=broker.project_id,
-            subscription=subscription.name,
-            role=role_definition['id'],
-            member=Output.format("serviceAccount:{0}", self._sa_email),
-            opts=opts
-        )
+        if binding_mode == BINDING_MODE:
+            IamBindings.add_member(IamBindings.SUBSCRIPTION, subscription, subscription_name, broker.project_id, role_definition["id"], role_definition["name"], self._member)
+        else:
+            self._add_member(SubscriptionIAMMember, f"{self._app_id}-{subscription_name}-{role_definition['name']}",
+                project=broker.project_id,
+                subscription=subscription.name,
+                role=role_definition["id"],
+            )
 
     def add_storage_role(self, storage: GoogleCloudStorage, role_config: dict):
         role_definition = config.ROLE_DEFINITIONS[role_config["roleID"]]
@@ -76,13 +76,12 @@ class ServiceAccount(AbstractAccount):
 
         bucket_name = role_config["storageTargetID"]
         bucket = storage.buckets[bucket_name]
-        opts = ResourceOptions(parent=self._service_account)
-        BucketIAMMember(
-            f"{self._app_id}-{bucket_name}-{role_definition['name']}",
+        if IamBindings.get_mode(storage_config[role_config["storage"]]) == BINDING_MODE:
+            IamBindings.add_member(IamBindings.BUCKET, bucket, bucket_name, storage.project_id, role_definition["id"], role_definition["name"], self._member)
+            return
+        self._add_member(BucketIAMMember, f"{self._app_id}-{bucket_name}-{role_definition['name']}",
             bucket=bucket.name,
-            role=role_definition['id'],
-            member=Output.format("serviceAccount:{0}", self._sa_email),
-            opts=opts
+            role=role_definition["id"],
         )
 
     def export_config(self):
@@ -112,11 +111,18 @@ class ServiceAccount(AbstractAccount):
         return service_account, private_key
 
     def _add_project_role(self, resource, role_definition: dict):
-        opts = ResourceOptions(parent=self._service_account)
-        projects.IAMMember(
-            f"{self._app_id}-{resource.project_id}-{role_definition['name']}",
+        self._add_member(projects.IAMMember, f"{self._app_id}-{resource.project_id}-{role_definition['name']}",
             project=resource.project_id,
-            role=role_definition['id'],
-            member=Output.format("serviceAccount:{0}", self._sa_email),
-            opts=opts
+            role=role_definition["id"],
+        )
+
+    def _add_member(self, member_type, name: str, **kwargs):
+        # the same role on the same resource can be requested by several roles of the account, e.g. the viewer role
+        if name in self._members: return self._members[name]
+        self._members[name] = member_type(
+            name,
+            member=self._member,
+            opts=ResourceOptions(parent=self._service_account),
+            **kwargs
         )
+        return self._members[name]
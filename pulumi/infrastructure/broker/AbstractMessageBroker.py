@@ -19,6 +19,10 @@ from infrastructure.ResourceCreator import ResourceCreator
 
 class AbstractMessageBroker(ABC, ResourceCreator):
 
+    @abstractmethod
+    def lookup_existing_resources(self, topics_config: dict):
+        raise NotImplementedError
+
     @abstractmethod
     def add_topic(self, topic_name: str, topic_config: dict):
         raise NotImplementedError
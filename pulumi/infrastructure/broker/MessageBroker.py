@@ -16,9 +16,6 @@ from pulumi import ComponentResource, ResourceOptions
 
 from infrastructure.platform.Platform import Platform
 from infrastructure.broker.AbstractMessageBroker import AbstractMessageBroker
-from infrastructure.broker.service_bus.ServiceBusMessageBroker import ServiceBusMessageBroker
-from infrastructure.broker.pubsub.PubSubMessageBroker import PubSubMessageBroker
-from infrastructure.broker.kafka.KafkaMessageBroker import KafkaMessageBroker
 
 
 class MessageBroker(ComponentResource, AbstractMessageBroker):
@@ -30,13 +27,20 @@ class MessageBroker(ComponentResource, AbstractMessageBroker):
         opts = ResourceOptions(parent=workspace)
         super().__init__(resource_type, resource_name, None, opts)
 
+        # Provider SDKs are imported only for the broker types in use
         broker_type = broker_config["type"]
         if broker_type == "servicebus":
+            from infrastructure.broker.service_bus.ServiceBusMessageBroker import ServiceBusMessageBroker
             self._broker_instance = ServiceBusMessageBroker(broker_id, broker_config, resource_group=workspace, parent=self)
         elif broker_type == "pubsub":
+            from infrastructure.broker.pubsub.PubSubMessageBroker import PubSubMessageBroker
             self._broker_instance = PubSubMessageBroker(broker_id, broker_config, project=workspace, parent=self)
         elif broker_type == "kafka":
-            self._broker_instance = KafkaMessageBroker(broker_id, broker_config, kubernetes_provider=workspace, parent=self)
+            from infrastructure.broker.kafka.KafkaMessageBroker import KafkaMessageBroker
+            self._broker_instance = KafkaMessageBroker(broker_id, broker_config, kubernetes_provider=workspace, kubeconfig=platform.get_kubeconfig(), parent=self)
+
+    def lookup_existing_resources(self, topics_config: dict):
+        return self._broker_instance.lookup_existing_resources(topics_config)
 
     def add_topic(self, topic_name: str, topic_config: dict):
         return self._broker_instance.add_topic(topic_name, topic_config)
@@ -12,47 +12,96 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from pulumi import ResourceOptions, Output
+import json
+import math
+
+from pulumi import ResourceOptions, Output, RunError
 from pulumi.resource import CustomTimeouts
 from pulumi_kubernetes import Provider
-from pulumi_kubernetes.helm.v3 import Chart, LocalChartOpts
+from pulumi_kubernetes.apiextensions import CustomResource
+from pulumi_kubernetes.helm.v3 import LocalChartOpts
 from pulumi_kubernetes.core.v1 import Namespace, ServicePatch, ServiceSpecPatchArgs, ServicePortPatchArgs
 from pulumi_kubernetes.meta.v1 import ObjectMetaPatchArgs
 from pulumi_kubernetes.yaml import ConfigFile
 
+from infrastructure.RenderedChart import RenderedChart
+from infrastructure.RenderedConfigFile import RenderedConfigFile
+from infrastructure.ReadinessCheck import ReadinessCheck
 from infrastructure.ResourceCreator import ResourceCreator
 from infrastructure.broker.AbstractMessageBroker import AbstractMessageBroker
+from infrastructure.cluster.KubernetesCluster import KubernetesCluster
 import infrastructure.broker.kafka.kafka_config as config
 
 
 class KafkaMessageBroker(AbstractMessageBroker):
+    STRIMZI_API_VERSION = "kafka.strimzi.io/v1beta2"
+    TOPIC_RESOURCE_TYPE = f"kubernetes:{STRIMZI_API_VERSION}:KafkaTopic"
+    KRAFT_FEATURE_GATES = "+UseKRaft,+KafkaNodePools"
+
+    STRIMZI_OPERATOR_NAME = "strimzi-cluster-operator"
 
-    def __init__(self, broker_id: str, broker_config: dict, kubernetes_provider: Provider, parent) -> None:
+    def __init__(self, broker_id: str, broker_config: dict, kubernetes_provider: Provider, kubeconfig: Output, parent) -> None:
         self._parent = parent
+        self._kubeconfig = kubeconfig
+        self._readiness = {**config.readiness_properties, **broker_config.get("readiness", {})}
 
         strimzi_operator_namespace = broker_config.get("strimziOperatorNamespace", config.cluster_properties["strimziOperatorNamespace"])
         self._kafka_cluster_namespace = broker_config.get("clusterNamespace", config.cluster_properties["clusterNamespace"])
         self._kafka_cluster_name = broker_config.get("clusterName", config.cluster_properties["clusterName"])
 
         self._kafka_cluster = None
+        self._kafka_ready = None
         self._broker_addr = broker_config.get("bootstrapServers")
         if self._broker_addr: return
 
         strimzi_ns = self._create_namespace(strimzi_operator_namespace, kubernetes_provider)
         kafka_ns = self._create_namespace(self._kafka_cluster_namespace, kubernetes_provider)
-        strimzi_operator = self._deploy_strimzi_cluster_operator(strimzi_ns, kafka_ns)
-        self._kafka_cluster = self._add_kafka_cluster(self._kafka_cluster_name, broker_config, strimzi_operator, kafka_ns)
+        strimzi_operator = self._deploy_strimzi_cluster_operator(strimzi_ns, kafka_ns, broker_config)
+        operator_ready = self._add_operator_readiness(strimzi_operator, strimzi_operator_namespace) if self._readiness["enabled"] else strimzi_operator.ready
+        self._kafka_cluster = self._add_kafka_cluster(self._kafka_cluster_name, broker_config, operator_ready, kafka_ns)
+        if self._readiness["enabled"]:
+            self._kafka_ready = self._add_kafka_readiness(self._kafka_cluster, broker_config)
         self._broker_addr = self._get_broker_addr(self._kafka_cluster)
 
     # interface methods
+    def lookup_existing_resources(self, topics_config: dict):
+        # Kafka topics are managed by the Strimzi topic operator and are never imported
+        return None
+
     def add_topic(self, topic_name: str, topic_config: dict):
+        unknown_keys = set(topic_config.get("config") or {}) - set(config.topic_properties["config"])
+        if unknown_keys:
+            raise RunError(f"Unknown config of Kafka topic <{topic_name}>: {', '.join(sorted(unknown_keys))}. Valid keys: {', '.join(config.topic_properties['config'])}")
+
+        throughput_config = {**config.topic_throughput_properties, **topic_config.get("throughput", {})}
+        if "partitions" not in topic_config and throughput_config["targetMBps"]:
+            # Strimzi cannot reduce the partitions of a topic, so the derived count never goes below the default or the deployed count
+            topic_config["partitions"] = max(
+                KafkaMessageBroker.get_partition_count(
+                    throughput_config["targetMBps"],
+                    throughput_config["producerPartitionMBps"],
+                    throughput_config["consumerPartitionMBps"],
+                ),
+                config.topic_properties["partitions"],
+                self._get_deployed_partitions(topic_name) or 0,
+            )
+
         topic_data = None
-        opts = ResourceOptions(parent=self._kafka_cluster, depends_on=self._kafka_cluster)
+        opts = ResourceOptions(parent=self._kafka_cluster, depends_on=self._get_kafka_cluster_ready())
         return self.create_or_import_resource(topic_name, config.topic_properties, topic_config, topic_data, opts, self._create_topic)
 
     def add_subscription(self, topic_name: str, subscription_name: str, subscription_config: dict):
         return None
 
+    @staticmethod
+    def get_partition_count(target_throughput: float, producer_partition_throughput: float, consumer_partition_throughput: float) -> int:
+        # Enough partitions for both producers and consumers to reach the target throughput
+        return max(
+            1,
+            math.ceil(target_throughput / producer_partition_throughput),
+            math.ceil(target_throughput / consumer_partition_throughput),
+        )
+
     def export_config(self) -> dict:
         kafka_config = {
             "brokerAddr": self._broker_addr,
@@ -60,27 +109,80 @@ class KafkaMessageBroker(AbstractMessageBroker):
         return kafka_config
 
     # internal methods
-    def _deploy_strimzi_cluster_operator(self, strimzi_ns: Namespace, kafka_ns: Namespace):
+    def _deploy_strimzi_cluster_operator(self, strimzi_ns: Namespace, kafka_ns: Namespace, broker_config: dict):
         values = {
             "watchNamespaces": [kafka_ns._name]
         }
+        feature_gates = broker_config.get("featureGates")
+        if feature_gates is None and broker_config.get("mode", config.cluster_properties["mode"]) == "kraft":
+            feature_gates = KafkaMessageBroker.KRAFT_FEATURE_GATES
+        if feature_gates:
+            values["featureGates"] = feature_gates
 
-        return Chart(
+        # the operator rollout is watched by its readiness check instead of the chart await
+        transformations = [KafkaMessageBroker._skip_operator_await] if self._readiness["enabled"] else []
+
+        return RenderedChart(
             release_name="strimzi-kafka-operator",
             config=LocalChartOpts(
                 path=f"../helm_charts/strimzi-kafka-operator",
                 namespace=strimzi_ns._name,
                 values=values,
+                transformations=transformations,
             ),
             opts=ResourceOptions(
                 parent=strimzi_ns,
             )
         )
 
-    def _add_kafka_cluster(self, cluster_name: str, cluster_config: dict, strimzi_operator: Chart, kafka_ns: Namespace):
+    @staticmethod
+    def _skip_operator_await(obj, opts):
+        if obj.get("kind") == "Deployment" and obj["metadata"]["name"] == KafkaMessageBroker.STRIMZI_OPERATOR_NAME:
+            obj["metadata"].setdefault("annotations", {})["pulumi.com/skipAwait"] = "true"
+
+    def _add_operator_readiness(self, strimzi_operator: RenderedChart, strimzi_operator_namespace: str) -> ReadinessCheck:
+        return ReadinessCheck(
+            f"{strimzi_operator_namespace}-{KafkaMessageBroker.STRIMZI_OPERATOR_NAME}-ready",
+            resource="deployment.apps",
+            object_name=KafkaMessageBroker.STRIMZI_OPERATOR_NAME,
+            namespace=strimzi_operator_namespace,
+            condition="Available",
+            failure_conditions={
+                "Progressing": {"status": "False", "reasons": ["ProgressDeadlineExceeded"]},
+                "ReplicaFailure": {"status": "True"},
+            },
+            timeout=self._readiness["timeout"],
+            poll_interval=self._readiness["pollInterval"],
+            kubeconfig=self._kubeconfig,
+            opts=ResourceOptions(parent=strimzi_operator, depends_on=strimzi_operator.ready),
+        )
+
+    def _add_kafka_readiness(self, kafka_cluster: ConfigFile, cluster_config: dict) -> ReadinessCheck:
+        return ReadinessCheck(
+            f"{self._kafka_cluster_name}-ready",
+            resource="kafkas.kafka.strimzi.io",
+            object_name=self._kafka_cluster_name,
+            namespace=self._kafka_cluster_namespace,
+            condition="Ready",
+            failure_conditions={
+                "NotReady": {"status": "True", "reasons": self._readiness["failureReasons"]},
+            },
+            timeout=self._readiness["timeout"],
+            poll_interval=self._readiness["pollInterval"],
+            kubeconfig=self._kubeconfig,
+            # cluster config changes roll the brokers, the condition is waited for again
+            trigger=json.dumps({key: value for key, value in cluster_config.items() if key not in ("topics", "readiness")}, sort_keys=True, default=str),
+            opts=ResourceOptions(parent=kafka_cluster, depends_on=self._get_kafka_cluster_ready()),
+        )
+
+    def _add_kafka_cluster(self, cluster_name: str, cluster_config: dict, operator_ready, kafka_ns: Namespace):
         cluster_data = None
-        opts = ResourceOptions(parent=kafka_ns, depends_on=strimzi_operator.ready)
-        return self.create_or_import_resource(cluster_name, config.cluster_properties, cluster_config, cluster_data, opts, self._create_kafka)
+        profile = cluster_config.get("profile", config.cluster_properties["profile"])
+        if profile not in config.profile_cluster_properties:
+            raise RunError(f"Unknown profile <{profile}> of Kafka cluster <{cluster_name}>. Valid profiles: {', '.join(config.profile_cluster_properties)}")
+        cluster_properties = config.profile_cluster_properties[profile]
+        opts = ResourceOptions(parent=kafka_ns, depends_on=operator_ready)
+        return self.create_or_import_resource(cluster_name, cluster_properties, cluster_config, cluster_data, opts, self._create_kafka)
 
     def _create_namespace(self, namespace_name: str, kubernetes_provider: Provider) -> Namespace:
         return Namespace(
@@ -99,12 +201,131 @@ class KafkaMessageBroker(AbstractMessageBroker):
             obj["metadata"]["namespace"] = self._kafka_cluster_namespace
             if obj["kind"] != "Kafka": return
             obj["metadata"]["name"] = kafka_name
-            obj["spec"]["kafka"]["listeners"] = kafka_config.listeners
+            kafka_spec = obj["spec"]["kafka"]
+            kafka_spec["listeners"] = kafka_config.listeners
+            kafka_spec["version"] = kafka_config.version
+            # broker configs without a profile default are passed to Strimzi as they are
+            broker_config = {**(kafka_config.user_config.get("config") or {}), **kafka_config.config}
+            kafka_spec["config"].update({key: value for key, value in broker_config.items() if value is not None})
+            if kafka_config.mode == "kraft":
+                # the node pools own the replicas, storage and resources of the brokers and controllers
+                obj["metadata"]["annotations"] = {"strimzi.io/node-pools": "enabled", "strimzi.io/kraft": "enabled"}
+                del obj["spec"]["zookeeper"]
+                del kafka_spec["replicas"]
+                del kafka_spec["storage"]
+                kafka_spec["config"].pop("inter.broker.protocol.version", None)
+                if kafka_config.metadata_version:
+                    kafka_spec["metadataVersion"] = kafka_config.metadata_version
+                return
+            kafka_spec["replicas"] = kafka_config.replicas
+            kafka_spec["storage"]["volumes"] = self._get_storage_volumes(kafka_config.storage)
+            resources = self._get_resource_requirements(kafka_config.resources)
+            if resources:
+                kafka_spec["resources"] = resources
+            jvm_options = {f"-X{key[1:]}": value for key, value in kafka_config.jvm_options.items() if value}
+            if jvm_options:
+                kafka_spec["jvmOptions"] = jvm_options
+            obj["spec"]["zookeeper"]["replicas"] = kafka_config.zookeeper_replicas
+            if kafka_config.node_pool:
+                for component in ("kafka", "zookeeper"):
+                    obj["spec"][component]["template"] = self._get_pod_placement_template(kafka_config.node_pool)
 
-        return ConfigFile(kafka_name,
+        kafka = ConfigFile(kafka_name,
             file="./infrastructure/broker/kafka/resources/kafka-metrics.yaml",
             transformations=[configure_kafka],
             opts=opts)
+        if kafka_config.mode == "kraft":
+            self._add_node_pools(kafka_name, kafka_config, kafka)
+        return kafka
+
+    def _add_node_pools(self, kafka_name: str, kafka_config: ResourceCreator.ResourceConfigProperties, kafka: ConfigFile) -> list[CustomResource]:
+        controllers_config = kafka_config.controllers
+        controller_storage = {
+            "volume_count": 1,
+            "volume_size": controllers_config["volume_size"],
+            "storage_class": controllers_config["storage_class"],
+            "delete_claim": controllers_config["delete_claim"],
+        }
+        jvm_options = {f"-X{key[1:]}": value for key, value in kafka_config.jvm_options.items() if value}
+        return [
+            self._create_node_pool(kafka_name, "controllers", ["controller"], controllers_config["replicas"],
+                controller_storage, controllers_config, {}, kafka_config.node_pool, kafka),
+            self._create_node_pool(kafka_name, "brokers", ["broker"], kafka_config.replicas,
+                kafka_config.storage, kafka_config.resources, jvm_options, kafka_config.node_pool, kafka),
+        ]
+
+    def _create_node_pool(self, kafka_name: str, pool_name: str, roles: list[str], replicas: int, storage_config: dict, resources_config: dict, jvm_options: dict, node_pool: str, kafka: ConfigFile) -> CustomResource:
+        spec = {
+            "replicas": replicas,
+            "roles": roles,
+            "storage": {
+                "type": "jbod",
+                "volumes": self._get_storage_volumes(storage_config),
+            },
+        }
+        resources = self._get_resource_requirements(resources_config)
+        if resources:
+            spec["resources"] = resources
+        if jvm_options:
+            spec["jvmOptions"] = jvm_options
+        if node_pool:
+            spec["template"] = self._get_pod_placement_template(node_pool)
+
+        return CustomResource(
+            f"{kafka_name}-{pool_name}",
+            api_version=KafkaMessageBroker.STRIMZI_API_VERSION,
+            kind="KafkaNodePool",
+            metadata={
+                # clusters can share a namespace, so the pools are named after their cluster
+                "name": f"{kafka_name}-{pool_name}",
+                "namespace": self._kafka_cluster_namespace,
+                "labels": {"strimzi.io/cluster": kafka_name},
+            },
+            spec=spec,
+            opts=ResourceOptions(parent=kafka),
+        )
+
+    @staticmethod
+    def _get_storage_volumes(storage_config: dict) -> list[dict]:
+        volumes = []
+        for volume_id in range(storage_config["volume_count"]):
+            volume = {
+                "id": volume_id,
+                "type": "persistent-claim",
+                "size": storage_config["volume_size"],
+                "deleteClaim": storage_config["delete_claim"],
+            }
+            if storage_config["storage_class"]:
+                volume["class"] = storage_config["storage_class"]
+            volumes.append(volume)
+        return volumes
+
+    @staticmethod
+    def _get_pod_placement_template(pool_name: str) -> dict:
+        # Strimzi pod templates have no node selector, the node pool label is required through node affinity
+        node_selector, tolerations = KubernetesCluster.get_node_pool_placement(pool_name)
+        match_expressions = [{"key": key, "operator": "In", "values": [value]} for key, value in node_selector.items()]
+        return {
+            "pod": {
+                "affinity": {
+                    "nodeAffinity": {
+                        "requiredDuringSchedulingIgnoredDuringExecution": {
+                            "nodeSelectorTerms": [{"matchExpressions": match_expressions}],
+                        },
+                    },
+                },
+                "tolerations": tolerations,
+            },
+        }
+
+    @staticmethod
+    def _get_resource_requirements(resources_config: dict) -> dict:
+        resources = {}
+        for requirement in ("request", "limit"):
+            values = {name: resources_config[f"{name}_{requirement}"] for name in ("cpu", "memory") if resources_config[f"{name}_{requirement}"]}
+            if values:
+                resources[f"{requirement}s"] = values
+        return resources
 
     def _get_broker_addr(self, kafka_cluster: ConfigFile):
         bootstrap_svc_name = f"{self._kafka_cluster_name}-kafka-bootstrap"
@@ -121,17 +342,30 @@ class KafkaMessageBroker(AbstractMessageBroker):
             spec=ServiceSpecPatchArgs(ports=internal_ports),
             opts=ResourceOptions(
                 parent=kafka_cluster,
-                depends_on=kafka_cluster,
-                custom_timeouts=CustomTimeouts(create='20m')
+                # the bootstrap service exists once the Kafka cluster is ready, otherwise the patch is retried until it appears
+                depends_on=[self._kafka_ready] if self._kafka_ready else self._get_kafka_cluster_ready(),
+                custom_timeouts=None if self._kafka_ready else CustomTimeouts(create='20m')
             )
         )
 
         return bootstrap_svc.spec.apply(lambda spec:
             Output.format(",".join([f"{spec.get('cluster_ip')}:{port['port']}" for port in spec['ports'][1:]])))
 
-    def _create_topic(self, topic_name: str, topic_config: ResourceCreator.ResourceConfigProperties, opts: ResourceOptions) -> ConfigFile:
+    def _get_kafka_cluster_ready(self):
+        # Depending on the cluster component itself would include its own children, e.g. the topics and the bootstrap service patch
+        if self._kafka_cluster is None: return None
+        return self._kafka_cluster.resources.apply(lambda resources: list(resources.values()))
+
+    def _get_deployed_partitions(self, topic_name: str) -> int:
+        # Only known when the topic is found in the stack state
+        topic_key = self.resource_key(KafkaMessageBroker.TOPIC_RESOURCE_TYPE, f"{self._kafka_cluster_namespace}/{topic_name}")
+        managed_topic = ResourceCreator.get_stack_state().get(topic_key)
+        if managed_topic is None: return None
+        return (managed_topic.outputs.get("spec") or {}).get("partitions")
+
+    def _create_topic(self, topic_name: str, topic_config: ResourceCreator.ResourceConfigProperties, opts: ResourceOptions) -> RenderedConfigFile:
         def set_config_param(obj, key, param):
-            if not param: return
+            if param is None: return
             if not obj["spec"].get("config"):
                 obj["spec"]["config"] = {}
             obj["spec"]["config"][key] = param
@@ -142,10 +376,11 @@ class KafkaMessageBroker(AbstractMessageBroker):
             obj["metadata"]["labels"]["strimzi.io/cluster"] = self._kafka_cluster_name
             obj["spec"]["partitions"] = topic_config.partitions
             obj["spec"]["replicas"] = topic_config.replicas
-            set_config_param(obj, "retention.ms", topic_config.config["retention_ms"])
-            set_config_param(obj, "segment.bytes", topic_config.config["segment_bytes"])
+            # topic config keys are the snake case names of the Kafka configs, e.g. retention_ms for retention.ms
+            for key, param in topic_config.config.items():
+                set_config_param(obj, key.replace("_", "."), param)
 
-        return ConfigFile(topic_name,
+        return RenderedConfigFile(topic_name,
             file="./infrastructure/broker/kafka/resources/kafka-topic.yaml",
             transformations=[configure_topic],
             opts=opts)
@@ -16,6 +16,58 @@ cluster_properties = {
     "strimziOperatorNamespace": "strimzi-operator",
     "clusterNamespace": "kafka-cluster",
     "clusterName": "kafka-cluster",
+    "profile": "default",
+    "nodePool": None,
+    "mode": "zookeeper", # [zookeeper, kraft]
+    "version": "3.5.1",
+    # KRaft metadata version, e.g. 3.5-IV2, defaults to the one of the Kafka version
+    "metadataVersion": None,
+    # Strimzi operator feature gates, KRaft clusters enable +UseKRaft,+KafkaNodePools if not set
+    "featureGates": None,
+    "replicas": 3,
+    "zookeeperReplicas": 3,
+    # KafkaNodePool of the KRaft controllers, the broker pool uses the replicas, storage, resources and jvmOptions
+    "controllers": {
+        "replicas": 3,
+        "volumeSize": "20Gi",
+        "storageClass": None,
+        "deleteClaim": False,
+        "cpuRequest": None,
+        "memoryRequest": None,
+        "cpuLimit": None,
+        "memoryLimit": None,
+    },
+    "config": {
+        "offsets.topic.replication.factor": 3,
+        "transaction.state.log.replication.factor": 3,
+        "transaction.state.log.min.isr": 2,
+        "default.replication.factor": 3,
+        "min.insync.replicas": 2,
+        "num.network.threads": None,
+        "num.io.threads": None,
+        "num.replica.fetchers": None,
+        "socket.send.buffer.bytes": None,
+        "socket.receive.buffer.bytes": None,
+        "socket.request.max.bytes": None,
+        "log.segment.bytes": None,
+        "compression.type": None,
+    },
+    "storage": {
+        "volumeCount": 1,
+        "volumeSize": "100Gi",
+        "storageClass": None,
+        "deleteClaim": False,
+    },
+    "resources": {
+        "cpuRequest": None,
+        "memoryRequest": None,
+        "cpuLimit": None,
+        "memoryLimit": None,
+    },
+    "jvmOptions": {
+        "xms": None,
+        "xmx": None,
+    },
     "listeners": [
         {
             # plain
@@ -41,11 +93,155 @@ cluster_properties = {
     ],
 }
 
+# Performance profiles only replace the defaults, every key can still be set in the broker config
+performance_profiles = {
+    "default": {},
+    "throughput": {
+        "config": {
+            **cluster_properties["config"],
+            "num.network.threads": 8,
+            "num.io.threads": 16,
+            "num.replica.fetchers": 4,
+            "socket.send.buffer.bytes": 1048576,
+            "socket.receive.buffer.bytes": 1048576,
+            "socket.request.max.bytes": 104857600,
+            "log.segment.bytes": 1073741824,
+            "compression.type": "lz4",
+        },
+        "storage": {
+            **cluster_properties["storage"],
+            "volumeCount": 2,
+            "volumeSize": "500Gi",
+        },
+        "resources": {
+            "cpuRequest": "4",
+            "memoryRequest": "16Gi",
+            "cpuLimit": None,
+            "memoryLimit": "16Gi",
+        },
+        "jvmOptions": {
+            "xms": "6g",
+            "xmx": "6g",
+        },
+    },
+    "low-latency": {
+        "config": {
+            **cluster_properties["config"],
+            "num.network.threads": 6,
+            "num.io.threads": 8,
+            "num.replica.fetchers": 2,
+            "socket.send.buffer.bytes": 262144,
+            "socket.receive.buffer.bytes": 262144,
+            "socket.request.max.bytes": 104857600,
+            "log.segment.bytes": 268435456,
+            "compression.type": "producer",
+        },
+        "storage": {
+            **cluster_properties["storage"],
+            "volumeSize": "200Gi",
+        },
+        "resources": {
+            "cpuRequest": "2",
+            "memoryRequest": "8Gi",
+            "cpuLimit": None,
+            "memoryLimit": "8Gi",
+        },
+        "jvmOptions": {
+            "xms": "4g",
+            "xmx": "4g",
+        },
+    },
+    "small-dev": {
+        "replicas": 1,
+        "zookeeperReplicas": 1,
+        "controllers": {
+            **cluster_properties["controllers"],
+            "replicas": 1,
+            "volumeSize": "5Gi",
+            "deleteClaim": True,
+        },
+        "config": {
+            **cluster_properties["config"],
+            "offsets.topic.replication.factor": 1,
+            "transaction.state.log.replication.factor": 1,
+            "transaction.state.log.min.isr": 1,
+            "default.replication.factor": 1,
+            "min.insync.replicas": 1,
+            "num.network.threads": 2,
+            "num.io.threads": 4,
+        },
+        "storage": {
+            **cluster_properties["storage"],
+            "volumeSize": "10Gi",
+            "deleteClaim": True,
+        },
+        "resources": {
+            "cpuRequest": "250m",
+            "memoryRequest": "1Gi",
+            "cpuLimit": None,
+            "memoryLimit": "1Gi",
+        },
+        "jvmOptions": {
+            "xms": "512m",
+            "xmx": "512m",
+        },
+    },
+}
+
+# Cluster properties with the defaults of every performance profile
+profile_cluster_properties = {
+    profile_name: {**cluster_properties, **profile, "profile": profile_name}
+    for profile_name, profile in performance_profiles.items()
+}
+
 topic_properties = {
     "partitions": 3,
     "replicas": 1,
     "config": {
         "retentionMs": None,
+        "retentionBytes": None,
         "segmentBytes": None,
+        "segmentMs": None,
+        "segmentJitterMs": None,
+        "segmentIndexBytes": None,
+        "cleanupPolicy": None,
+        "compressionType": None,
+        "deleteRetentionMs": None,
+        "fileDeleteDelayMs": None,
+        "flushMessages": None,
+        "flushMs": None,
+        "indexIntervalBytes": None,
+        "maxCompactionLagMs": None,
+        "maxMessageBytes": None,
+        "messageDownconversionEnable": None,
+        "messageTimestampDifferenceMaxMs": None,
+        "messageTimestampType": None,
+        "minCleanableDirtyRatio": None,
+        "minCompactionLagMs": None,
+        "minInsyncReplicas": None,
+        "preallocate": None,
+        "uncleanLeaderElectionEnable": None,
     },
 }
+
+# Condition-based waits for the Strimzi operator rollout and the Kafka Ready condition, polled with kubectl
+readiness_properties = {
+    "enabled": False,
+    "timeout": 1200,
+    "pollInterval": 10,
+    # Kafka NotReady reasons that are reported by Strimzi for errors waiting does not resolve
+    "failureReasons": [
+        "InvalidResourceException",
+        "InvalidConfigurationException",
+        "InvalidConfigParameterException",
+        "KafkaUpgradeException",
+        "UnsupportedKafkaVersionException",
+    ],
+}
+
+# Partition count of a topic with a declared target throughput, in MB/s
+topic_throughput_properties = {
+    "targetMBps": None,
+    "producerPartitionMBps": 10,
+    "consumerPartitionMBps": 20,
+}
@@ -12,28 +12,49 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from functools import partial
+
 from pulumi import ResourceOptions
 from pulumi_gcp import organizations, pubsub
 
 from infrastructure.ResourceCreator import ResourceCreator
 from infrastructure.broker.AbstractMessageBroker import AbstractMessageBroker
+from infrastructure.platform.gcp.IamBindings import IamBindings, BINDING_MODE
 import infrastructure.broker.pubsub.pubsub_config as pubsub_config
 from config import resource_tags
 
 
 class PubSubMessageBroker(AbstractMessageBroker):
+    TOPIC_RESOURCE_TYPE = "gcp:pubsub/topic:Topic"
+    SUBSCRIPTION_RESOURCE_TYPE = "gcp:pubsub/subscription:Subscription"
+    SERVICE_AGENT_MEMBER = "serviceAccount:service-{project_number}@gcp-sa-pubsub.iam.gserviceaccount.com"
 
     def __init__(self, broker_id: str, broker_config: dict, project: organizations.Project, parent) -> None:
+        super().__init__()
         self._parent = parent
         self._project_id = project.project_id
+        self._project_number = project.number
 
         self.project_id = broker_config["projectID"]
+        self._discovery = broker_config.get("discovery", False) is True
+        self._binding_mode = IamBindings.get_mode(broker_config)
         self.topics = {}
         self.subscriptions = {}
+        self._dead_letter_publishers = {}
 
     # interface methods
+    def lookup_existing_resources(self, topics_config: dict):
+        lookups = {}
+        for topic_name, topic_config in topics_config.items():
+            lookups[self._topic_key(topic_name)] = partial(self._get_topic, topic_name)
+            for subscription_name in topic_config.get("subscriptions", {}):
+                lookups[self._subscription_key(topic_name, subscription_name)] = partial(self._get_subscription, subscription_name)
+
+        discovered_keys = self.discover_resources(self.project_id, lookups, self._discover_resources) if self._discovery else None
+        self.lookup_resources(lookups, discovered_keys)
+
     def add_topic(self, topic_name: str, topic_config: dict):
-        topic_data = self._get_topic(topic_name)
+        topic_data = self.lookup_resource(self._topic_key(topic_name), partial(self._get_topic, topic_name))
 
         if resource_tags and not topic_config.get("labels"):
             topic_config["labels"] = resource_tags
@@ -45,7 +66,7 @@ class PubSubMessageBroker(AbstractMessageBroker):
         return topic
 
     def add_subscription(self, topic_name: str, subscription_name: str, subscription_config: dict):
-        subscription_data = self._get_subscription(subscription_name)
+        subscription_data = self.lookup_resource(self._subscription_key(topic_name, subscription_name), partial(self._get_subscription, subscription_name))
 
         if resource_tags and not subscription_config.get("labels"):
             subscription_config["labels"] = resource_tags
@@ -63,6 +84,23 @@ class PubSubMessageBroker(AbstractMessageBroker):
         return platform_config
 
     # internal methods
+    def _discover_resources(self) -> set[str]:
+        from google.cloud import pubsub_v1
+
+        project_path = f"projects/{self.project_id}"
+        discovered_keys = set()
+        for topic in pubsub_v1.PublisherClient().list_topics(request={"project": project_path}):
+            discovered_keys.add(self._topic_key(topic.name.split("/")[-1]))
+        for subscription in pubsub_v1.SubscriberClient().list_subscriptions(request={"project": project_path}):
+            discovered_keys.add(self._subscription_key(subscription.topic.split("/")[-1], subscription.name.split("/")[-1]))
+        return discovered_keys
+
+    def _topic_key(self, topic_name: str) -> str:
+        return self.resource_key(PubSubMessageBroker.TOPIC_RESOURCE_TYPE, topic_name)
+
+    def _subscription_key(self, topic_name: str, subscription_name: str) -> str:
+        return self.resource_key(PubSubMessageBroker.SUBSCRIPTION_RESOURCE_TYPE, f"{topic_name}-{subscription_name}")
+
     def _get_topic(self, topic_name: str) -> pubsub.Topic:
         try:
             topic_data = pubsub.get_topic(
@@ -108,13 +146,20 @@ class PubSubMessageBroker(AbstractMessageBroker):
             push_host = push_config.get("host")
             push_endpoint = f"https://{push_host}/push" if push_host else push_config.get("push_endpoint")
 
-        return pubsub.Subscription(
+        dead_letter_topic = None
+        if subscription_config.dead_letter_policies:
+            dead_letter_topic = subscription_config.dead_letter_policies[0].get("dead_letter_topic")
+
+        subscription = pubsub.Subscription(
             f"{topic_name}-{subscription_name}",
             name=subscription_name,
             topic=topic_name,
             project=self._project_id,
+            ack_deadline_seconds=subscription_config.ack_deadline_seconds,
             retain_acked_messages=subscription_config.retain_acked_messages,
             enable_message_ordering=subscription_config.enable_message_ordering,
+            enable_exactly_once_delivery=subscription_config.enable_exactly_once_delivery,
+            filter=subscription_config.filter,
             retry_policy=pubsub.SubscriptionRetryPolicyArgs(
                 minimum_backoff=subscription_config.retry_policies[0].get("minimum_backoff"),
                 maximum_backoff=subscription_config.retry_policies[0].get("maximum_backoff"),
@@ -122,6 +167,61 @@ class PubSubMessageBroker(AbstractMessageBroker):
             push_config=pubsub.SubscriptionPushConfigArgs(
                 push_endpoint=push_endpoint,
             ) if push_endpoint else None,
+            dead_letter_policy=pubsub.SubscriptionDeadLetterPolicyArgs(
+                dead_letter_topic=self._get_topic_id(dead_letter_topic),
+                max_delivery_attempts=subscription_config.dead_letter_policies[0].get("max_delivery_attempts"),
+            ) if dead_letter_topic else None,
+            expiration_policy=pubsub.SubscriptionExpirationPolicyArgs(
+                ttl=subscription_config.expiration_policies[0].get("ttl"),
+            ) if subscription_config.expiration_policies and subscription_config.expiration_policies[0].get("ttl") is not None else None,
+            bigquery_config=pubsub.SubscriptionBigqueryConfigArgs(
+                table=subscription_config.bigquery_configs[0].get("table"),
+                use_topic_schema=subscription_config.bigquery_configs[0].get("use_topic_schema"),
+                write_metadata=subscription_config.bigquery_configs[0].get("write_metadata"),
+                drop_unknown_fields=subscription_config.bigquery_configs[0].get("drop_unknown_fields"),
+            ) if subscription_config.bigquery_configs and subscription_config.bigquery_configs[0].get("table") else None,
             labels=subscription_config.labels,
             opts=opts
         )
+
+        if dead_letter_topic:
+            self._add_dead_letter_roles(subscription, subscription_name, dead_letter_topic)
+        return subscription
+
+    def _get_topic_id(self, topic_name: str):
+        topic = self.topics.get(topic_name)
+        if topic is not None:
+            return topic.id
+        if topic_name.startswith("projects/"):
+            return topic_name
+        return f"projects/{self.project_id}/topics/{topic_name}"
+
+    def _add_dead_letter_roles(self, subscription: pubsub.Subscription, subscription_name: str, dead_letter_topic: str):
+        # The Pub/Sub service agent forwards undeliverable messages, so it has to acknowledge them on the
+        # subscription and publish them to the dead letter topic
+        service_agent = self._project_number.apply(lambda number: PubSubMessageBroker.SERVICE_AGENT_MEMBER.format(project_number=number))
+        # with bindings the service agent is added to the bindings of the accounts, a separate member would be removed by them
+        if self._binding_mode == BINDING_MODE:
+            IamBindings.add_member(IamBindings.SUBSCRIPTION, subscription, subscription_name, self.project_id, "roles/pubsub.subscriber", "subscriber", service_agent)
+        else:
+            pubsub.SubscriptionIAMMember(
+                f"{subscription._name}-dead-letter-subscriber",
+                subscription=subscription.id,
+                role="roles/pubsub.subscriber",
+                member=service_agent,
+                opts=ResourceOptions(parent=subscription)
+            )
+
+        if dead_letter_topic in self._dead_letter_publishers: return
+        topic = self.topics.get(dead_letter_topic)
+        if self._binding_mode == BINDING_MODE and topic is not None:
+            IamBindings.add_member(IamBindings.TOPIC, topic, dead_letter_topic, self.project_id, "roles/pubsub.publisher", "publisher", service_agent)
+            self._dead_letter_publishers[dead_letter_topic] = topic
+            return
+        self._dead_letter_publishers[dead_letter_topic] = pubsub.TopicIAMMember(
+            f"{dead_letter_topic.split('/')[-1]}-dead-letter-publisher",
+            topic=self._get_topic_id(dead_letter_topic),
+            role="roles/pubsub.publisher",
+            member=service_agent,
+            opts=ResourceOptions(parent=topic or self._parent)
+        )
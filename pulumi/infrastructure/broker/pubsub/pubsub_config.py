@@ -22,8 +22,11 @@ topic_properties = {
 }
 
 subscription_properties = {
+    "ackDeadlineSeconds": None,
     "retainAckedMessages": None,
     "enableMessageOrdering": None,
+    "enableExactlyOnceDelivery": None,
+    "filter": None,
     "retryPolicies": [{
         "minimumBackoff": None,
         "maximumBackoff": None,
@@ -31,5 +34,18 @@ subscription_properties = {
     "pushConfigs": [{
         "host": None,
     }],
+    "deadLetterPolicies": [{
+        "deadLetterTopic": None, # topic name or projects/{project}/topics/{topic}
+        "maxDeliveryAttempts": None,
+    }],
+    "expirationPolicies": [{
+        "ttl": None, # empty string never expires
+    }],
+    "bigqueryConfigs": [{
+        "table": None, # {project}.{dataset}.{table}
+        "useTopicSchema": None,
+        "writeMetadata": None,
+        "dropUnknownFields": None,
+    }],
     "labels": None,
 }
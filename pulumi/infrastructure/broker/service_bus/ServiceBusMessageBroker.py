@@ -12,21 +12,33 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from pulumi import ResourceOptions
-from pulumi_azure_native import servicebus, resources
+import math
+from functools import partial
+
+from pulumi import ResourceOptions, log
+from pulumi_azure_native import authorization, servicebus, resources
 
 from infrastructure.ResourceCreator import ResourceCreator
+from infrastructure.StackState import StackState
 from infrastructure.broker.AbstractMessageBroker import AbstractMessageBroker
 import infrastructure.broker.service_bus.servicebus_config as config
 
 
 class ServiceBusMessageBroker(AbstractMessageBroker):
+    NAMESPACE_RESOURCE_TYPE = "azure-native:servicebus:Namespace"
+    TOPIC_RESOURCE_TYPE = "azure-native:servicebus:Topic"
+    SUBSCRIPTION_RESOURCE_TYPE = "azure-native:servicebus:Subscription"
 
     def __init__(self, broker_id: str, broker_config: dict, resource_group: resources.ResourceGroup, parent) -> None:
+        super().__init__()
         self._parent = parent
         self._resource_group_name = resource_group.name
+        self._discovery = broker_config.get("discovery", False) is True
 
+        self.resource_group_name = broker_config["resourceGroup"]
         self.namespace_name = broker_config.get("azsbNamespace", broker_id)
+        self._namespace_exists = False
+        self.sizing = None
         self.namespace = self._add_namespace(self.namespace_name, broker_config)
         self._connection_string = self._get_connection_string()
 
@@ -34,8 +46,29 @@ class ServiceBusMessageBroker(AbstractMessageBroker):
         self.subscriptions = {}
 
     # interface methods
+    def lookup_existing_resources(self, topics_config: dict):
+        lookups = {}
+        for topic_name, topic_config in topics_config.items():
+            lookups[self._topic_key(topic_name)] = partial(self._get_topic, topic_name)
+            for subscription_name in topic_config.get("subscriptions", {}):
+                lookups[self._subscription_key(topic_name, subscription_name)] = partial(self._get_subscription, topic_name, subscription_name)
+
+        discovered_keys = None
+        if not self._namespace_exists:
+            # Topics and subscriptions cannot exist in a namespace that is being created
+            discovered_keys = set()
+        elif self._discovery:
+            discovered_keys = self.discover_resources(self.namespace_name, lookups, partial(self._discover_resources, topics_config.keys()))
+        self.lookup_resources(lookups, discovered_keys)
+
     def add_topic(self, topic_name: str, topic_config: dict):
-        topic_data = self._get_topic(topic_name)
+        topic_data = self.lookup_resource(self._topic_key(topic_name), partial(self._get_topic, topic_name))
+
+        topic_sizing = dict(self.sizing["topics"].get(topic_name, {})) if self.sizing else {}
+        if topic_data is not None:
+            # partitioning of existing topics cannot be changed
+            topic_sizing.pop("enablePartitioning", None)
+        topic_config = {**topic_sizing, **topic_config}
 
         opts = ResourceOptions(parent=self.namespace)
         topic = self.create_or_import_resource(topic_name, config.topic_properties, topic_config, topic_data, opts, self._create_topic)
@@ -44,7 +77,7 @@ class ServiceBusMessageBroker(AbstractMessageBroker):
         return topic
 
     def add_subscription(self, topic_name: str, subscription_name: str, subscription_config: dict):
-        subscription_data = self._get_subscription(topic_name, subscription_name)
+        subscription_data = self.lookup_resource(self._subscription_key(topic_name, subscription_name), partial(self._get_subscription, topic_name, subscription_name))
 
         topic = self.topics[topic_name]
         opts = ResourceOptions(parent=topic)
@@ -52,6 +85,48 @@ class ServiceBusMessageBroker(AbstractMessageBroker):
         self.subscriptions[topic_name][subscription_name] = subscription
         return subscription
 
+    @staticmethod
+    def get_namespace_sizing(topics_throughput: dict, sizing_config: dict, tier: str = None) -> dict:
+        # Smallest tier and messaging unit capacity that handle the declared throughput of all topics
+        messages_per_second = sum(throughput["messagesPerSecond"] for throughput in topics_throughput.values())
+        throughput_mbps = sum(throughput["messagesPerSecond"] * throughput["averageMessageSizeKB"] / 1024 for throughput in topics_throughput.values())
+        message_sizes_kb = {
+            topic_name: math.ceil(throughput["averageMessageSizeKB"] * sizing_config["messageSizeHeadroom"])
+            for topic_name, throughput in topics_throughput.items()
+        }
+
+        if tier is None:
+            premium = (
+                messages_per_second > sizing_config["standardMessagesPerSecond"]
+                or throughput_mbps > sizing_config["standardMBps"]
+                or max(message_sizes_kb.values()) > config.standard_max_message_size_kb
+            )
+            tier = "PREMIUM" if premium else "STANDARD"
+
+        sizing = {
+            "tier": tier,
+            "capacity": None,
+            "messagesPerSecond": messages_per_second,
+            "throughputMBps": round(throughput_mbps, 3),
+            "topics": {},
+        }
+        if tier == "PREMIUM":
+            required_units = max(
+                1,
+                math.ceil(messages_per_second / sizing_config["messagingUnitMessagesPerSecond"]),
+                math.ceil(throughput_mbps / sizing_config["messagingUnitMBps"]),
+            )
+            sizing["requiredMessagingUnits"] = required_units
+            sizing["capacity"] = next((capacity for capacity in config.premium_capacities if capacity >= required_units), config.premium_capacities[-1])
+
+        min_message_size_kb, max_message_size_kb = config.premium_message_size_limits_kb
+        for topic_name, throughput in topics_throughput.items():
+            if tier == "PREMIUM":
+                sizing["topics"][topic_name] = {"maxMessageSizeInKilobytes": min(max_message_size_kb, max(min_message_size_kb, message_sizes_kb[topic_name]))}
+            else:
+                sizing["topics"][topic_name] = {"enablePartitioning": throughput["messagesPerSecond"] > sizing_config["partitionMessagesPerSecond"]}
+        return sizing
+
     def export_config(self) -> dict:
         platform_config = {
             "connectionString": self._connection_string,
@@ -60,15 +135,71 @@ class ServiceBusMessageBroker(AbstractMessageBroker):
 
     # internal methods
     def _add_namespace(self, namespace_name: str, broker_config: dict) -> servicebus.Namespace:
-        namespace_data = self._get_namespace(namespace_name)
+        namespace_key = self.resource_key(ServiceBusMessageBroker.NAMESPACE_RESOURCE_TYPE, namespace_name)
+        namespace_data = self.lookup_resource(namespace_key, partial(self._get_namespace, namespace_name))
+        if isinstance(namespace_data, StackState.ManagedResource):
+            # the SKU of a namespace found in the stack state is read from its outputs
+            namespace_data = ResourceCreator._managed_resource_data(namespace_data, config.namespace_properties)
+        self._namespace_exists = namespace_data is not None
+
+        if "sku" not in broker_config:
+            self.sizing = self._get_sizing(namespace_name, broker_config, namespace_data)
+        if self.sizing:
+            broker_config = {**broker_config, "sku": ServiceBusMessageBroker._get_sizing_sku(self.sizing, namespace_data)}
+
         opts = ResourceOptions(parent=self._parent)
         return self.create_or_import_resource(namespace_name, config.namespace_properties, broker_config, namespace_data, opts, self._create_namespace)
 
+    def _get_sizing(self, namespace_name: str, broker_config: dict, namespace_data) -> dict:
+        topics_throughput = {
+            topic_name: {**config.topic_throughput_properties, **topic_config["throughput"]}
+            for topic_name, topic_config in broker_config.get("topics", {}).items()
+            if topic_config.get("throughput", {}).get("messagesPerSecond")
+        }
+        if not topics_throughput: return None
+        sizing_config = {**config.sizing_properties, **broker_config.get("sizing", {})}
+
+        sizing = ServiceBusMessageBroker.get_namespace_sizing(topics_throughput, sizing_config)
+        existing_tier = ServiceBusMessageBroker._get_sku_tier(namespace_data)
+        if existing_tier and existing_tier != sizing["tier"]:
+            # the tier of an existing namespace cannot be changed in place
+            if sizing["tier"] == "PREMIUM":
+                log.warn(f"Service Bus namespace <{namespace_name}> needs the Premium tier for the declared throughput, but the existing namespace is {existing_tier.capitalize()}. Migrate the namespace to scale it.")
+            sizing = ServiceBusMessageBroker.get_namespace_sizing(topics_throughput, sizing_config, existing_tier)
+        if sizing["tier"] == "PREMIUM" and sizing["requiredMessagingUnits"] > sizing["capacity"]:
+            log.warn(f"Service Bus namespace <{namespace_name}> needs {sizing['requiredMessagingUnits']} messaging units for the declared throughput, but is limited to {sizing['capacity']}.")
+        return sizing
+
+    @staticmethod
+    def _get_sku(namespace_data) -> dict:
+        # cached and stack state lookups hold the SKU as a dict, provider lookups as an object
+        sku = getattr(namespace_data, "sku", None) if namespace_data is not None else None
+        if not sku: return None
+        if isinstance(sku, dict):
+            return {key: sku.get(key) for key in ("name", "tier", "capacity")}
+        return {key: getattr(sku, key, None) for key in ("name", "tier", "capacity")}
+
+    @staticmethod
+    def _get_sku_tier(namespace_data) -> str:
+        sku = ServiceBusMessageBroker._get_sku(namespace_data)
+        return sku["tier"].upper() if sku and sku["tier"] else None
+
+    @staticmethod
+    def _get_sizing_sku(sizing: dict, namespace_data) -> dict:
+        # Azure reports the SKU as e.g. Standard, the existing strings are kept so an unchanged namespace is imported as it is
+        existing_sku = ServiceBusMessageBroker._get_sku(namespace_data)
+        if existing_sku and existing_sku["name"] and existing_sku["tier"]:
+            # messaging units are only sized on Premium, other tiers keep the reported capacity
+            capacity = sizing["capacity"] if sizing["tier"] == "PREMIUM" else existing_sku["capacity"]
+            return {"name": existing_sku["name"], "tier": existing_sku["tier"], "capacity": capacity}
+        tier = sizing["tier"].capitalize()
+        return {"name": tier, "tier": tier, "capacity": sizing["capacity"]}
+
     def _get_namespace(self, namespace_name: str) -> servicebus.Namespace:
         try:
             namespace_data = servicebus.get_namespace(
                 namespace_name=namespace_name,
-                resource_group_name=self._resource_group_name
+                resource_group_name=self.resource_group_name
             )
         except:
             namespace_data = None
@@ -92,6 +223,28 @@ class ServiceBusMessageBroker(AbstractMessageBroker):
             opts=opts
         )
 
+    def _discover_resources(self, topic_names) -> set[str]:
+        from azure.identity import DefaultAzureCredential
+        from azure.mgmt.servicebus import ServiceBusManagementClient
+
+        subscription_id = authorization.get_client_config().subscription_id
+        client = ServiceBusManagementClient(DefaultAzureCredential(), subscription_id)
+
+        discovered_keys = set()
+        for topic in client.topics.list_by_namespace(self.resource_group_name, self.namespace_name):
+            discovered_keys.add(self._topic_key(topic.name))
+            # only list subscriptions of configured topics, other topics in the namespace are not managed by the stack
+            if topic.name not in topic_names: continue
+            for subscription in client.subscriptions.list_by_topic(self.resource_group_name, self.namespace_name, topic.name):
+                discovered_keys.add(self._subscription_key(topic.name, subscription.name))
+        return discovered_keys
+
+    def _topic_key(self, topic_name: str) -> str:
+        return self.resource_key(ServiceBusMessageBroker.TOPIC_RESOURCE_TYPE, topic_name)
+
+    def _subscription_key(self, topic_name: str, subscription_name: str) -> str:
+        return self.resource_key(ServiceBusMessageBroker.SUBSCRIPTION_RESOURCE_TYPE, f"{topic_name}-{subscription_name}")
+
     def _get_connection_string(self):
         keys = servicebus.list_namespace_keys_output(
             authorization_rule_name="RootManageSharedAccessKey",
@@ -103,8 +256,8 @@ class ServiceBusMessageBroker(AbstractMessageBroker):
     def _get_topic(self, topic_name: str) -> servicebus.Topic:
         try:
             topic_data = servicebus.get_topic(
-                namespace_name=self.namespace.name,
-                resource_group_name=self._resource_group_name,
+                namespace_name=self.namespace_name,
+                resource_group_name=self.resource_group_name,
                 topic_name=topic_name
             )
         except:
@@ -134,8 +287,8 @@ class ServiceBusMessageBroker(AbstractMessageBroker):
     def _get_subscription(self, topic_name: str, subscription_name: str) -> servicebus.Subscription:
         try:
             subscription_data = servicebus.get_subscription(
-                namespace_name=self.namespace.name,
-                resource_group_name=self._resource_group_name,
+                namespace_name=self.namespace_name,
+                resource_group_name=self.resource_group_name,
                 topic_name=topic_name,
                 subscription_name=subscription_name
             )
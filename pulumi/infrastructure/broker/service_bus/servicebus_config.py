@@ -54,3 +54,25 @@ subscription_properties = {
     "status": None,
     "isClientAffine": None,
 }
+
+# Declared throughput of a topic, used to size the namespace
+topic_throughput_properties = {
+    "messagesPerSecond": None,
+    "averageMessageSizeKB": 1,
+}
+
+# Throughput a namespace handles before it is throttled, overridable with the sizing block of the broker
+sizing_properties = {
+    "standardMessagesPerSecond": 1000,
+    "standardMBps": 1,
+    "messagingUnitMessagesPerSecond": 4000,
+    "messagingUnitMBps": 4,
+    # Standard tier topics above this rate are partitioned
+    "partitionMessagesPerSecond": 200,
+    # maximum message size of Premium tier topics as a multiple of the average message size
+    "messageSizeHeadroom": 4,
+}
+
+premium_capacities = [1, 2, 4, 8, 16]
+standard_max_message_size_kb = 256
+premium_message_size_limits_kb = (1024, 102400)
@@ -12,11 +12,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import pulumi
+from pulumi import Output
+import pulumi_kubernetes as kubernetes
+
+import digests
 from infrastructure.platform.Platform import Platform
 from infrastructure.cluster.KubernetesCluster import KubernetesCluster
 from infrastructure.broker.MessageBroker import MessageBroker
 from infrastructure.storage.Storage import Storage
 from infrastructure.accounts.Account import Account
+from infrastructure.platform.gcp.IamBindings import IamBindings
 
 platform = Platform()
 
@@ -24,8 +30,24 @@ platform = Platform()
 def create_cluster(cluster_map):
     cluster_id, cluster_config = list(cluster_map.items())[0]
     cluster = KubernetesCluster(cluster_id, cluster_config, platform)
+    digests.register(f"cluster:{cluster_id}", cluster_config, cluster)
     kubernetes_provider = cluster.get_kubernetes_provider()
-    platform.set_kubernetes_provider(kubernetes_provider)
+    platform.set_kubernetes_provider(kubernetes_provider, cluster.get_kubeconfig())
+    return kubernetes_provider
+
+
+def create_workspaces(*resource_maps):
+    for resource_map in resource_maps:
+        for resource_config in resource_map.values():
+            platform.get_workspace(resource_config)
+    return platform.export_workspaces(), platform.get_kubeconfig()
+
+
+def use_platform_outputs(kubeconfig: Output, workspace_references: Output):
+    # The cluster and the workspaces are owned by the platform stack, only references to them are registered
+    kubernetes_provider = kubernetes.Provider("kubernetes-provider", kubeconfig=kubeconfig)
+    platform.set_kubernetes_provider(kubernetes_provider, kubeconfig)
+    platform.use_workspace_references(workspace_references)
     return kubernetes_provider
 
 
@@ -37,10 +59,12 @@ def create_storage(storage_map):
         storage = Storage(storage_id, storage_config, platform)
 
         buckets = storage_config.get("buckets", {})
+        storage.lookup_existing_resources(buckets)
         for bucket_name, bucket_config in buckets.items():
             storage.add_bucket(bucket_name, bucket_config)
 
         storage.register_outputs({})
+        digests.register(f"storage:{storage_id}", storage_config, storage)
 
         storage_resources[storage_id] = storage.get_instance()
         exported_config[storage_id] = storage.export_config()
@@ -51,23 +75,32 @@ def create_storage(storage_map):
 def create_brokers(brokers_map):
     broker_resources = {}
     exported_config = {}
+    broker_sizing = {}
 
     for broker_id, broker_config in brokers_map.items():
         broker = MessageBroker(broker_id, broker_config, platform)
 
         topics = broker_config.get("topics", {})
+        broker.lookup_existing_resources(topics)
         for topic_name, topic_config in topics.items():
             broker.add_topic(topic_name, topic_config)
 
+        # subscriptions can reference any topic of the broker, e.g. as their dead letter topic
+        for topic_name, topic_config in topics.items():
             subscriptions = topic_config.get("subscriptions", {})
             for subscription_name, subscription_config in subscriptions.items():
                 broker.add_subscription(topic_name, subscription_name, subscription_config)
 
         broker.register_outputs({})
+        digests.register(f"broker:{broker_id}", broker_config, broker)
 
         broker_resources[broker_id] = broker.get_instance()
         exported_config[broker_id] = broker.export_config()
+        if getattr(broker_resources[broker_id], "sizing", None):
+            broker_sizing[broker_id] = broker_resources[broker_id].sizing
 
+    if broker_sizing:
+        pulumi.export("brokerSizing", broker_sizing)
     return broker_resources, exported_config
 
 
@@ -89,5 +122,8 @@ def create_accounts(accounts_map, broker_resources, storage_resources):
                 account.add_storage_role(storage_resources[storage], role_config)
 
         account.register_outputs({})
+        digests.register(f"account:{app_id}", account_config, account)
 
+    # bindings are created once the members of every account are known
+    IamBindings.create_bindings()
     return exported_config
@@ -16,9 +16,16 @@ from abc import ABC, abstractmethod
 
 from infrastructure.ResourceCreator import ResourceCreator
 
+# Label of the nodes of every additional node pool, used to place workloads on the pool
+NODE_POOL_LABEL = "dataphos.io/node-pool"
+
 
 class AbstractKubernetesCluster(ABC, ResourceCreator):
 
+    @abstractmethod
+    def get_kubeconfig(self):
+        raise NotImplementedError
+
     @abstractmethod
     def get_kubernetes_provider(self):
         raise NotImplementedError
@@ -12,12 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from pulumi import ComponentResource, ResourceOptions
+from pulumi import ComponentResource, ResourceOptions, RunError
 
 from infrastructure.platform.Platform import Platform
-from infrastructure.cluster.AbstractKubernetesCluster import AbstractKubernetesCluster
-from infrastructure.cluster.aks.AksCluster import AksCluster
-from infrastructure.cluster.gke.GkeCluster import GkeCluster
+from infrastructure.cluster.AbstractKubernetesCluster import AbstractKubernetesCluster, NODE_POOL_LABEL
+import config
 
 
 class KubernetesCluster(ComponentResource, AbstractKubernetesCluster):
@@ -29,13 +28,36 @@ class KubernetesCluster(ComponentResource, AbstractKubernetesCluster):
         opts = ResourceOptions(parent=workspace)
         super().__init__(resource_type, resource_name, None, opts)
 
+        # Provider SDKs are imported only for the cluster type in use
         cluster_type = cluster_config["type"]
         if cluster_type == "aks":
+            from infrastructure.cluster.aks.AksCluster import AksCluster
             self._cluster_instance = AksCluster(cluster_id, cluster_config, resource_group=workspace, parent=self)
         elif cluster_type == "gke":
+            from infrastructure.cluster.gke.GkeCluster import GkeCluster
             self._cluster_instance = GkeCluster(cluster_id, cluster_config, project=workspace, parent=self)
 
         self.register_outputs({})
 
+    def get_kubeconfig(self):
+        return self._cluster_instance.get_kubeconfig()
+
     def get_kubernetes_provider(self):
         return self._cluster_instance.get_kubernetes_provider()
+
+    @staticmethod
+    def get_node_pool_placement(pool_name: str) -> tuple[dict, list[dict]]:
+        # Node selector and tolerations of pods placed on an additional node pool of the cluster
+        cluster_config = list(config.cluster.values())[0] if config.cluster else {}
+        pool_config = cluster_config.get("nodePools", {}).get(pool_name)
+        if pool_config is None:
+            raise RunError(f"Node pool <{pool_name}> is not configured in the cluster nodePools")
+
+        node_selector = {NODE_POOL_LABEL: pool_name}
+        tolerations = [{
+            "key": taint["key"],
+            "operator": "Equal",
+            "value": taint.get("value", ""),
+            "effect": taint["effect"],
+        } for taint in pool_config.get("taints", [])]
+        return node_selector, tolerations
@@ -19,7 +19,7 @@ from pulumi_azure_native import containerservice, resources
 import pulumi_kubernetes as kubernetes
 
 from infrastructure.ResourceCreator import ResourceCreator
-from infrastructure.cluster.AbstractKubernetesCluster import AbstractKubernetesCluster
+from infrastructure.cluster.AbstractKubernetesCluster import AbstractKubernetesCluster, NODE_POOL_LABEL
 import infrastructure.cluster.aks.aks_config as config
 
 
@@ -32,21 +32,28 @@ class AksCluster(AbstractKubernetesCluster):
         cluster_name = cluster_config.get("name", cluster_id)
         self._cluster = self._add_cluster(cluster_name, cluster_config)
         self._cluster_name = self._cluster.name if self._cluster else cluster_name
+        for pool_name, pool_config in cluster_config.get("nodePools", {}).items():
+            self._add_agent_pool(pool_name, pool_config)
+        self._kubeconfig = None
 
     # interface methods
+    def get_kubeconfig(self):
+        if self._kubeconfig is None:
+            creds = containerservice.list_managed_cluster_user_credentials_output(
+                resource_group_name=self._resource_group_name,
+                resource_name=self._cluster_name,
+            )
+            self._kubeconfig = creds.kubeconfigs[0].value.apply(
+                lambda enc: base64.b64decode(enc).decode()
+            )
+        return self._kubeconfig
+
     def get_kubernetes_provider(self):
         parent = self._cluster if self._cluster else self._parent
 
-        creds = containerservice.list_managed_cluster_user_credentials_output(
-            resource_group_name=self._resource_group_name,
-            resource_name=self._cluster_name,
-        )
-        kubeconfig = creds.kubeconfigs[0].value.apply(
-            lambda enc: base64.b64decode(enc).decode()
-        )
         return kubernetes.Provider(
             "aks-kubernetes-provider",
-            kubeconfig=kubeconfig,
+            kubeconfig=self.get_kubeconfig(),
             cluster=self._cluster_name,
             opts=ResourceOptions(parent=parent)
         )
@@ -100,3 +107,31 @@ class AksCluster(AbstractKubernetesCluster):
             tags=cluster_config.tags,
             opts=opts
         )
+
+    def _add_agent_pool(self, pool_name: str, pool_config: dict) -> containerservice.AgentPool:
+        pool_data = None
+        opts = ResourceOptions(parent=self._cluster if self._cluster else self._parent)
+        return self.create_or_import_resource(pool_name, config.agent_pool_properties, pool_config, pool_data, opts, self._create_agent_pool)
+
+    def _create_agent_pool(self, pool_name: str, pool_config: ResourceCreator.ResourceConfigProperties, opts: ResourceOptions) -> containerservice.AgentPool:
+        # Additional agent pools run user workloads, system pods stay on the cluster's agent pool profiles
+        return containerservice.AgentPool(
+            pool_name,
+            agent_pool_name=pool_name,
+            resource_group_name=self._resource_group_name,
+            resource_name_=self._cluster_name,
+            count=pool_config.count,
+            enable_auto_scaling=pool_config.enable_auto_scaling,
+            min_count=pool_config.min_count if pool_config.enable_auto_scaling else None,
+            max_count=pool_config.max_count if pool_config.enable_auto_scaling else None,
+            mode=containerservice.AgentPoolMode.USER,
+            os_disk_size_gb=pool_config.os_disk_size_gb,
+            os_type=pool_config.os_type,
+            type=containerservice.AgentPoolType.VIRTUAL_MACHINE_SCALE_SETS,
+            vm_size=pool_config.vm_size,
+            scale_set_priority=containerservice.ScaleSetPriority.SPOT if pool_config.spot else None,
+            node_labels={**(pool_config.labels or {}), NODE_POOL_LABEL: pool_name},
+            node_taints=[f"{taint['key']}={taint.get('value', '')}:{taint['effect']}" for taint in pool_config.taints or []],
+            tags=pool_config.tags,
+            opts=opts
+        )
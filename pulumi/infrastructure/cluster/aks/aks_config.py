@@ -50,3 +50,17 @@ cluster_properties = {
     "servicePrincipalProfile": None,
     "tags": None,
 }
+
+agent_pool_properties = {
+    "count": 1,
+    "enableAutoScaling": True,
+    "minCount": 1,
+    "maxCount": 3,
+    "vmSize": "Standard_D4s_v3",
+    "osDiskSizeGb": 128,
+    "osType": "Linux",
+    "spot": False,
+    "labels": None,
+    "taints": None,
+    "tags": None,
+}
@@ -12,45 +12,54 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from functools import partial
+
 from pulumi import ResourceOptions, Output
 from pulumi_gcp import container, organizations
 import pulumi_kubernetes as kubernetes
 
 from infrastructure.ResourceCreator import ResourceCreator
-from infrastructure.cluster.AbstractKubernetesCluster import AbstractKubernetesCluster
+from infrastructure.cluster.AbstractKubernetesCluster import AbstractKubernetesCluster, NODE_POOL_LABEL
 import infrastructure.cluster.gke.gke_config as gke_config
 from config import resource_tags
 
 
 class GkeCluster(AbstractKubernetesCluster):
+    CLUSTER_RESOURCE_TYPE = "gcp:container/cluster:Cluster"
 
     def __init__(self, cluster_id: str, cluster_config: dict, project: organizations.Project, parent) -> None:
+        super().__init__()
         self._parent = parent
         self._project_id = project.project_id
         cluster_name = cluster_config.get("name", cluster_id)
         self._cluster = self._add_cluster(cluster_name, cluster_config)
+        for pool_name, pool_config in cluster_config.get("nodePools", {}).items():
+            self._add_node_pool(pool_name, pool_config)
 
     # interface methods
-    def get_kubernetes_provider(self):
+    def get_kubeconfig(self):
         # Manufacture a GKE-style Kubeconfig. Note that this is slightly "different" because of the way GKE requires
         # gcloud to be in the picture for cluster authentication (rather than using the client cert/key directly).
         kubernetes_info = Output.all(self._cluster.name, self._cluster.endpoint, self._cluster.master_auth)
-        kubeconfig = Output.all(info=kubernetes_info, project_id=self._project_id, location=self._cluster.location).apply(
+        return Output.all(info=kubernetes_info, project_id=self._project_id, location=self._cluster.location).apply(
             lambda args: gke_config.kubeconfig_template.format(
                 args['info'][2]['cluster_ca_certificate'], args['info'][1], '{0}_{1}_{2}'.format(
                     args['project_id'], args['location'], args['info'][0]
                 )
             )
         )
+
+    def get_kubernetes_provider(self):
         return kubernetes.Provider(
             "gke-kubernetes-provider",
-            kubeconfig=kubeconfig,
+            kubeconfig=self.get_kubeconfig(),
             opts=ResourceOptions(parent=self._cluster)
         )
 
     # internal methods
     def _add_cluster(self, cluster_name: str, cluster_config: dict) -> container.Cluster:
-        cluster_data = self._get_cluster(cluster_name, cluster_config.get("location"))
+        cluster_key = self.resource_key(GkeCluster.CLUSTER_RESOURCE_TYPE, cluster_name)
+        cluster_data = self.lookup_resource(cluster_key, partial(self._get_cluster, cluster_name, cluster_config.get("location")))
 
         if resource_tags and not cluster_config.get("resourceLabels"):
             cluster_config["resourceLabels"] = resource_tags
@@ -94,3 +103,37 @@ class GkeCluster(AbstractKubernetesCluster):
             resource_labels=cluster_config.resource_labels,
             opts=opts
         )
+
+    def _add_node_pool(self, pool_name: str, pool_config: dict) -> container.NodePool:
+        pool_data = None
+        opts = ResourceOptions(parent=self._cluster)
+        return self.create_or_import_resource(pool_name, gke_config.node_pool_properties, pool_config, pool_data, opts, self._create_node_pool)
+
+    def _create_node_pool(self, pool_name: str, pool_config: ResourceCreator.ResourceConfigProperties, opts: ResourceOptions) -> container.NodePool:
+        return container.NodePool(
+            pool_name,
+            name=pool_name,
+            project=self._project_id,
+            cluster=self._cluster.name,
+            location=self._cluster.location,
+            initial_node_count=pool_config.initial_node_count,
+            autoscaling=container.NodePoolAutoscalingArgs(
+                min_node_count=pool_config.min_node_count,
+                max_node_count=pool_config.max_node_count,
+            ),
+            node_config=container.NodePoolNodeConfigArgs(
+                machine_type=pool_config.machine_type,
+                disk_size_gb=pool_config.disk_size_gb,
+                disk_type=pool_config.disk_type,
+                local_ssd_count=pool_config.local_ssd_count,
+                spot=pool_config.spot,
+                oauth_scopes=pool_config.oauth_scopes,
+                labels={**(pool_config.labels or {}), NODE_POOL_LABEL: pool_name},
+                taints=[container.NodePoolNodeConfigTaintArgs(
+                    key=taint["key"],
+                    value=taint.get("value", ""),
+                    effect=gke_config.taint_effects[taint["effect"]],
+                ) for taint in pool_config.taints or []],
+            ),
+            opts=opts
+        )
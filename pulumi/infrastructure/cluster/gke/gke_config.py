@@ -46,6 +46,29 @@ cluster_properties = {
     "resourceLabels": None,
 }
 
+node_pool_properties = {
+    "initialNodeCount": 1,
+    "minNodeCount": 1,
+    "maxNodeCount": 3,
+    "machineType": "e2-standard-4",
+    "diskSizeGb": 100,
+    "diskType": "pd-balanced", # [pd-standard, pd-balanced, pd-ssd]
+    "localSsdCount": None,
+    "spot": False,
+    "labels": None,
+    "taints": None,
+    "oauthScopes": [
+        "https://www.googleapis.com/auth/cloud-platform",
+    ],
+}
+
+# GKE taint effects of the Kubernetes taint effects
+taint_effects = {
+    "NoSchedule": "NO_SCHEDULE",
+    "PreferNoSchedule": "PREFER_NO_SCHEDULE",
+    "NoExecute": "NO_EXECUTE",
+}
+
 kubeconfig_template = \
 """
 apiVersion: v1
@@ -12,13 +12,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from typing import TYPE_CHECKING
+
+from pulumi import Output
 import pulumi_kubernetes as kubernetes
 
-from infrastructure.platform.azure.AzurePlatform import AzurePlatform
-from infrastructure.platform.gcp.GoogleCloudPlatform import GoogleCloudPlatform
 from infrastructure.platform.PlatformID import PlatformID
 import config
 
+if TYPE_CHECKING:
+    from infrastructure.platform.azure.AzurePlatform import AzurePlatform
+    from infrastructure.platform.gcp.GoogleCloudPlatform import GoogleCloudPlatform
+
 
 class Platform():
     RESOURCE_TYPE_TO_PLATFORM_MAP = {
@@ -38,8 +43,11 @@ class Platform():
     }
 
     def __init__(self):
-        self._azure_platform: AzurePlatform = None
-        self._gcp_platform: GoogleCloudPlatform = None
+        self._azure_platform: "AzurePlatform" = None
+        self._gcp_platform: "GoogleCloudPlatform" = None
+        self._kubernetes_provider: kubernetes.Provider = None
+        self._kubeconfig: Output = None
+        self._workspace_references: Output = None
 
     @staticmethod
     def get_platform(resource_type: str) -> PlatformID:
@@ -49,19 +57,44 @@ class Platform():
     def get_workspace_key(platform_id: PlatformID) -> str:
         return Platform.PLATFORM_ID_TO_WORKSPACE_KEY_MAP[platform_id]
 
-    def set_kubernetes_provider(self, kubernetes_provider: kubernetes.Provider) -> None:
+    def set_kubernetes_provider(self, kubernetes_provider: kubernetes.Provider, kubeconfig: Output = None) -> None:
         self._kubernetes_provider = kubernetes_provider
+        self._kubeconfig = kubeconfig
+
+    def get_kubeconfig(self) -> Output:
+        return self._kubeconfig
+
+    def use_workspace_references(self, workspace_references: Output) -> None:
+        # Workspaces owned by another stack are read by their IDs instead of being created or imported
+        self._workspace_references = workspace_references
+
+    def export_workspaces(self) -> dict:
+        return {
+            "resourceGroups": self._azure_platform.export_resource_groups() if self._azure_platform else {},
+            "projects": self._gcp_platform.export_projects() if self._gcp_platform else {},
+        }
 
     def get_workspace(self, resource_config: dict):
         platform = resource_config.get("platform") or Platform.get_platform(resource_config["type"])
+        # Provider SDKs are imported only for the platforms in use
         if platform == PlatformID.AZURE:
             if self._azure_platform is None:
+                from infrastructure.platform.azure.AzurePlatform import AzurePlatform
                 self._azure_platform = AzurePlatform(config.retain_resource_groups, config.resource_tags)
-            return self._azure_platform.get_resource_group(resource_group_name=resource_config["resourceGroup"])
+            resource_group_name = resource_config["resourceGroup"]
+            if self._workspace_references is not None:
+                resource_group_id = self._workspace_references.apply(lambda references: references["resourceGroups"][resource_group_name])
+                return self._azure_platform.get_resource_group_reference(resource_group_name, resource_group_id)
+            return self._azure_platform.get_resource_group(resource_group_name=resource_group_name)
         elif platform == PlatformID.GCP:
             if self._gcp_platform is None:
+                from infrastructure.platform.gcp.GoogleCloudPlatform import GoogleCloudPlatform
                 self._gcp_platform = GoogleCloudPlatform(config.retain_projects)
-            return self._gcp_platform.get_project(project_id=resource_config["projectID"])
+            project_id = resource_config["projectID"]
+            if self._workspace_references is not None:
+                project_resource_id = self._workspace_references.apply(lambda references: references["projects"][project_id])
+                return self._gcp_platform.get_project_reference(project_id, project_resource_id)
+            return self._gcp_platform.get_project(project_id=project_id)
         else:
             # Resources without a configured platform are considered Kubernetes resources
             return self._kubernetes_provider
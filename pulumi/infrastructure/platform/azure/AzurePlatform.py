@@ -12,7 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from pulumi import ComponentResource, ResourceOptions
+from functools import partial
+
+from pulumi import ComponentResource, Input, Output, ResourceOptions
 from pulumi_azure_native import resources
 
 from infrastructure.ResourceCreator import ResourceCreator
@@ -20,10 +22,12 @@ import infrastructure.platform.azure.azure_config as azure_config
 
 
 class AzurePlatform(ComponentResource, ResourceCreator):
+    RESOURCE_GROUP_RESOURCE_TYPE = "azure-native:resources:ResourceGroup"
 
     def __init__(self, retain_resource_groups: str, resource_group_tags: dict[str, str]):
         resource_type = 'dataphos:infrastructure:Platform'
         super().__init__(resource_type, "Azure", None, ResourceOptions())
+        ResourceCreator.__init__(self)
 
         self._resource_groups = {}
         self.retain_resource_groups = retain_resource_groups
@@ -34,10 +38,8 @@ class AzurePlatform(ComponentResource, ResourceCreator):
         if resource_group:
             return resource_group
 
-        try:
-            resource_group_data = resources.get_resource_group(resource_group_name)
-        except:
-            resource_group_data = None
+        resource_group_key = self.resource_key(AzurePlatform.RESOURCE_GROUP_RESOURCE_TYPE, resource_group_name)
+        resource_group_data = self.lookup_resource(resource_group_key, partial(self._get_resource_group, resource_group_name))
 
         resource_group_config = {
             "retain": self.retain_resource_groups,
@@ -49,6 +51,26 @@ class AzurePlatform(ComponentResource, ResourceCreator):
         self.register_outputs({})
         return resource_group
 
+    def get_resource_group_reference(self, resource_group_name: str, resource_group_id: Input[str]) -> resources.ResourceGroup:
+        resource_group = self._resource_groups.get(resource_group_name)
+        if resource_group:
+            return resource_group
+
+        resource_group = resources.ResourceGroup.get(resource_group_name, resource_group_id, opts=ResourceOptions(parent=self))
+        self._resource_groups[resource_group_name] = resource_group
+        self.register_outputs({})
+        return resource_group
+
+    def export_resource_groups(self) -> dict[str, Output]:
+        return {resource_group_name: resource_group.id for resource_group_name, resource_group in self._resource_groups.items()}
+
+    def _get_resource_group(self, resource_group_name: str) -> resources.AwaitableGetResourceGroupResult:
+        try:
+            resource_group_data = resources.get_resource_group(resource_group_name)
+        except:
+            resource_group_data = None
+        return resource_group_data
+
     def _create_resource_group(self, resource_group_name: str, resource_group_config: ResourceCreator.ResourceConfigProperties, opts: ResourceOptions) -> resources.ResourceGroup:
         return resources.ResourceGroup(
             resource_group_name,
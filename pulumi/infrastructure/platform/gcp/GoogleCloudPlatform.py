@@ -12,7 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from pulumi import ComponentResource, ResourceOptions
+from functools import partial
+
+from pulumi import ComponentResource, Input, Output, ResourceOptions
 from pulumi_gcp import organizations
 
 from infrastructure.ResourceCreator import ResourceCreator
@@ -20,10 +22,12 @@ import infrastructure.platform.gcp.gcp_config as gcp_config
 
 
 class GoogleCloudPlatform(ComponentResource, ResourceCreator):
+    PROJECT_RESOURCE_TYPE = "gcp:organizations/project:Project"
 
     def __init__(self, retain_projects: str):
         resource_type = 'dataphos:infrastructure:Platform'
         super().__init__(resource_type, "GCP", None, ResourceOptions())
+        ResourceCreator.__init__(self)
 
         self._projects = {}
         self.retain_projects = retain_projects
@@ -33,10 +37,8 @@ class GoogleCloudPlatform(ComponentResource, ResourceCreator):
         if project:
             return project
 
-        try:
-            project_data = organizations.get_project(project_id)
-        except:
-            project_data = None
+        project_key = self.resource_key(GoogleCloudPlatform.PROJECT_RESOURCE_TYPE, project_id)
+        project_data = self.lookup_resource(project_key, partial(self._get_project, project_id))
 
         project_config = { "retain": self.retain_projects }
         opts = ResourceOptions(parent=self)
@@ -45,6 +47,26 @@ class GoogleCloudPlatform(ComponentResource, ResourceCreator):
         self.register_outputs({})
         return project
 
+    def get_project_reference(self, project_id: str, project_resource_id: Input[str]) -> organizations.Project:
+        project = self._projects.get(project_id)
+        if project:
+            return project
+
+        project = organizations.Project.get(project_id, project_resource_id, opts=ResourceOptions(parent=self))
+        self._projects[project_id] = project
+        self.register_outputs({})
+        return project
+
+    def export_projects(self) -> dict[str, Output]:
+        return {project_id: project.id for project_id, project in self._projects.items()}
+
+    def _get_project(self, project_id: str) -> organizations.AwaitableGetProjectResult:
+        try:
+            project_data = organizations.get_project(project_id)
+        except:
+            project_data = None
+        return project_data
+
     def _create_project(self, project_id: str, project_config: ResourceCreator.ResourceConfigProperties, opts: ResourceOptions) -> organizations.Project:
         return organizations.Project(
             project_id,
@@ -0,0 +1,96 @@
+# Copyright 2024 Syntio Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from pulumi import Input, Output, Resource, ResourceOptions
+
+import config
+
+MEMBER_MODE = "member"
+BINDING_MODE = "binding"
+
+
+class IamBindings:
+    # Collects the members granted a role on a topic, subscription or bucket of the stack and creates a single
+    # authoritative binding for each of them once every account is added
+    TOPIC = "topic"
+    SUBSCRIPTION = "subscription"
+    BUCKET = "bucket"
+
+    _bindings = {}
+
+    @staticmethod
+    def get_mode(resource_config: dict) -> str:
+        # Other shards can not add their members to a binding, a binding would remove them
+        if config.shard:
+            return MEMBER_MODE
+        mode = resource_config.get("iamBindingMode", config.iam_binding_mode)
+        if mode not in (MEMBER_MODE, BINDING_MODE):
+            raise ValueError(f"Invalid iamBindingMode <{mode}>, expected <{MEMBER_MODE}> or <{BINDING_MODE}>")
+        return mode
+
+    @staticmethod
+    def add_member(kind: str, resource: Resource, resource_name: str, project: str, role_id: str, role_name: str, member: Input[str]):
+        key = (kind, project, resource_name, role_id)
+        binding = IamBindings._bindings.get(key)
+        if binding is None:
+            binding = IamBindings._bindings[key] = {
+                "kind": kind,
+                "resource": resource,
+                # resources of the same name can exist in several projects
+                "name": f"{project}-{resource_name}-{role_name}-binding",
+                "project": project,
+                "role": role_id,
+                "members": [],
+            }
+        binding["members"].append(member)
+
+    @staticmethod
+    def create_bindings() -> list[Resource]:
+        if not IamBindings._bindings: return []
+        # the provider SDK is imported only when a GCP resource grants roles through bindings
+        from pulumi_gcp import pubsub, storage
+
+        bindings = []
+        for binding in IamBindings._bindings.values():
+            # members granted the role more than once are listed once, sorted to keep the binding stable
+            members = Output.all(*binding["members"]).apply(lambda values: sorted(set(values)))
+            opts = ResourceOptions(parent=binding["resource"])
+            if binding["kind"] == IamBindings.TOPIC:
+                bindings.append(pubsub.TopicIAMBinding(
+                    binding["name"],
+                    project=binding["project"],
+                    topic=binding["resource"].name,
+                    role=binding["role"],
+                    members=members,
+                    opts=opts
+                ))
+            elif binding["kind"] == IamBindings.SUBSCRIPTION:
+                bindings.append(pubsub.SubscriptionIAMBinding(
+                    binding["name"],
+                    project=binding["project"],
+                    subscription=binding["resource"].name,
+                    role=binding["role"],
+                    members=members,
+                    opts=opts
+                ))
+            elif binding["kind"] == IamBindings.BUCKET:
+                bindings.append(storage.BucketIAMBinding(
+                    binding["name"],
+                    bucket=binding["resource"].name,
+                    role=binding["role"],
+                    members=members,
+                    opts=opts
+                ))
+        IamBindings._bindings.clear()
+        return bindings
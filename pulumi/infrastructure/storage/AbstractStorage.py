@@ -19,6 +19,10 @@ from infrastructure.ResourceCreator import ResourceCreator
 
 class AbstractStorage(ABC, ResourceCreator):
 
+    @abstractmethod
+    def lookup_existing_resources(self, buckets_config: dict):
+        raise NotImplementedError
+
     @abstractmethod
     def add_bucket(self, bucket_name: str, bucket_config: dict):
         raise NotImplementedError
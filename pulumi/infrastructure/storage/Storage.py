@@ -16,8 +16,6 @@ from pulumi import ComponentResource, ResourceOptions
 
 from infrastructure.platform.Platform import Platform
 from infrastructure.storage.AbstractStorage import AbstractStorage
-from infrastructure.storage.abs.AzureBlobStorage import AzureBlobStorage
-from infrastructure.storage.gcs.GoogleCloudStorage import GoogleCloudStorage
 
 
 class Storage(ComponentResource, AbstractStorage):
@@ -29,12 +27,18 @@ class Storage(ComponentResource, AbstractStorage):
         opts = ResourceOptions(parent=workspace)
         super().__init__(resource_type, resource_name, None, opts)
 
+        # Provider SDKs are imported only for the storage types in use
         storage_type = storage_config["type"]
         if storage_type == "abs":
+            from infrastructure.storage.abs.AzureBlobStorage import AzureBlobStorage
             self._storage_instance = AzureBlobStorage(storage_id, storage_config, resource_group=workspace, parent=self)
         elif storage_type == "gcs":
+            from infrastructure.storage.gcs.GoogleCloudStorage import GoogleCloudStorage
             self._storage_instance = GoogleCloudStorage(storage_id, storage_config, project=workspace, parent=self)
 
+    def lookup_existing_resources(self, buckets_config: dict):
+        return self._storage_instance.lookup_existing_resources(buckets_config)
+
     def add_bucket(self, bucket_name: str, bucket_config: dict):
         return self._storage_instance.add_bucket(bucket_name, bucket_config)
 
@@ -12,8 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import re
+from functools import partial
+
 from pulumi import ResourceOptions
-from pulumi_azure_native import storage, resources
+from pulumi_azure_native import authorization, storage, resources
 
 from infrastructure.ResourceCreator import ResourceCreator
 from infrastructure.storage.AbstractStorage import AbstractStorage
@@ -21,19 +24,38 @@ import infrastructure.storage.abs.abs_config as config
 
 
 class AzureBlobStorage(AbstractStorage):
+    ACCOUNT_RESOURCE_TYPE = "azure-native:storage:StorageAccount"
+    CONTAINER_RESOURCE_TYPE = "azure-native:storage:BlobContainer"
 
     def __init__(self, storage_id: str, storage_config: dict, resource_group: resources.ResourceGroup, parent) -> None:
+        super().__init__()
         self._parent = parent
         self._resource_group_name = resource_group.name
+        self._discovery = storage_config.get("discovery", False) is True
 
+        self.resource_group_name = storage_config["resourceGroup"]
         self.account_name = storage_config.get("accountStorageID", storage_id)
+        self._account_exists = False
         self.storage_account = self._add_storage_account(self.account_name, storage_config)
+        self._add_blob_service_properties(storage_config.get("softDelete"))
+        self._add_management_policy(storage_config.get("buckets", {}))
 
         self.containers = {}
 
     # interface methods
+    def lookup_existing_resources(self, buckets_config: dict):
+        lookups = {self._container_key(container_name): partial(self._get_blob_container, container_name) for container_name in buckets_config}
+
+        discovered_keys = None
+        if not self._account_exists:
+            # Containers cannot exist in a storage account that is being created
+            discovered_keys = set()
+        elif self._discovery:
+            discovered_keys = self.discover_resources(self.account_name, lookups, self._discover_resources)
+        self.lookup_resources(lookups, discovered_keys)
+
     def add_bucket(self, bucket_name: str, bucket_config: dict):
-        bucket_data = self._get_blob_container(bucket_name)
+        bucket_data = self.lookup_resource(self._container_key(bucket_name), partial(self._get_blob_container, bucket_name))
 
         opts = ResourceOptions(parent=self.storage_account)
         bucket = self.create_or_import_resource(bucket_name, config.container_properties, bucket_config, bucket_data, opts, self._create_blob_container)
@@ -48,15 +70,79 @@ class AzureBlobStorage(AbstractStorage):
 
     # internal methods
     def _add_storage_account(self, account_name: str, storage_config: dict) -> storage.StorageAccount:
-        account_data = self._get_storage_account(account_name)
+        account_key = self.resource_key(AzureBlobStorage.ACCOUNT_RESOURCE_TYPE, account_name)
+        account_data = self.lookup_resource(account_key, partial(self._get_storage_account, account_name))
+        self._account_exists = account_data is not None
         opts = ResourceOptions(parent=self._parent)
         return self.create_or_import_resource(account_name, config.account_properties, storage_config, account_data, opts, self._create_storage_account)
 
+    def _add_blob_service_properties(self, soft_delete_config: dict) -> storage.BlobServiceProperties:
+        if not soft_delete_config: return None
+        soft_delete_config = {**config.soft_delete_properties, **soft_delete_config}
+
+        return storage.BlobServiceProperties(
+            f"{self.account_name}-blob-service",
+            account_name=self.account_name,
+            resource_group_name=self._resource_group_name,
+            blob_services_name="default",
+            delete_retention_policy=self._get_retention_policy(soft_delete_config["blobRetentionDays"]),
+            container_delete_retention_policy=self._get_retention_policy(soft_delete_config["containerRetentionDays"]),
+            opts=ResourceOptions(parent=self.storage_account)
+        )
+
+    @staticmethod
+    def _get_retention_policy(days: int) -> storage.DeleteRetentionPolicyArgs:
+        # a retention of 0 days disables soft delete
+        if days is None: return None
+        return storage.DeleteRetentionPolicyArgs(enabled=days > 0, days=days if days > 0 else None)
+
+    def _add_management_policy(self, containers_config: dict) -> storage.ManagementPolicy:
+        # A storage account has a single lifecycle management policy with the rules of all its containers
+        rules = []
+        for container_name, container_config in containers_config.items():
+            lifecycle_config = container_config.get("lifecycle")
+            if not lifecycle_config: continue
+            lifecycle_config = {**config.container_lifecycle_properties, **lifecycle_config}
+            rules.append(storage.ManagementPolicyRuleArgs(
+                name=re.sub("[^a-zA-Z0-9]", "", container_name),
+                type=storage.RuleType.LIFECYCLE,
+                enabled=True,
+                definition=storage.ManagementPolicyDefinitionArgs(
+                    filters=storage.ManagementPolicyFilterArgs(
+                        blob_types=["blockBlob"],
+                        prefix_match=[f"{container_name}/{lifecycle_config['prefix'] or ''}"],
+                    ),
+                    actions=storage.ManagementPolicyActionArgs(
+                        base_blob=storage.ManagementPolicyBaseBlobArgs(
+                            tier_to_cool=self._get_days_after_modification(lifecycle_config["tierToCoolAfterDays"]),
+                            tier_to_cold=self._get_days_after_modification(lifecycle_config["tierToColdAfterDays"]),
+                            tier_to_archive=self._get_days_after_modification(lifecycle_config["tierToArchiveAfterDays"]),
+                            delete=self._get_days_after_modification(lifecycle_config["deleteAfterDays"]),
+                        ),
+                    ),
+                ),
+            ))
+        if not rules: return None
+
+        return storage.ManagementPolicy(
+            f"{self.account_name}-lifecycle",
+            account_name=self.account_name,
+            resource_group_name=self._resource_group_name,
+            management_policy_name="default",
+            policy=storage.ManagementPolicySchemaArgs(rules=rules),
+            opts=ResourceOptions(parent=self.storage_account)
+        )
+
+    @staticmethod
+    def _get_days_after_modification(days: int) -> storage.DateAfterModificationArgs:
+        if days is None: return None
+        return storage.DateAfterModificationArgs(days_after_modification_greater_than=days)
+
     def _get_storage_account(self, account_name: str) -> storage.StorageAccount:
         try:
             account_data = storage.get_storage_account(
                 account_name=account_name,
-                resource_group_name=self._resource_group_name
+                resource_group_name=self.resource_group_name
             )
         except:
             account_data = None
@@ -120,11 +206,22 @@ class AzureBlobStorage(AbstractStorage):
             opts=opts
         )
 
+    def _discover_resources(self) -> set[str]:
+        from azure.identity import DefaultAzureCredential
+        from azure.mgmt.storage import StorageManagementClient
+
+        subscription_id = authorization.get_client_config().subscription_id
+        client = StorageManagementClient(DefaultAzureCredential(), subscription_id)
+        return {self._container_key(container.name) for container in client.blob_containers.list(self.resource_group_name, self.account_name)}
+
+    def _container_key(self, container_name: str) -> str:
+        return self.resource_key(AzureBlobStorage.CONTAINER_RESOURCE_TYPE, container_name)
+
     def _get_blob_container(self, container_name: str) -> storage.BlobContainer:
         try:
             container_data = storage.get_blob_container(
                 account_name=self.account_name,
-                resource_group_name=self._resource_group_name,
+                resource_group_name=self.resource_group_name,
                 container_name=container_name
             )
         except:
@@ -51,3 +51,17 @@ container_properties = {
     "metadata": None,
     "publicAccess": None,
 }
+
+# Lifecycle management of the blobs of a container, in days since their last modification
+container_lifecycle_properties = {
+    "prefix": None,
+    "tierToCoolAfterDays": None,
+    "tierToColdAfterDays": None,
+    "tierToArchiveAfterDays": None,
+    "deleteAfterDays": None,
+}
+
+soft_delete_properties = {
+    "blobRetentionDays": None,
+    "containerRetentionDays": None,
+}
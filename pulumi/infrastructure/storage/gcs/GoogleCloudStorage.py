@@ -12,27 +12,47 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from functools import partial
+from types import SimpleNamespace
+
 from pulumi import ResourceOptions
 from pulumi_gcp import organizations, storage
 
 from infrastructure.ResourceCreator import ResourceCreator
+from infrastructure.StackState import StackState
 from infrastructure.storage.AbstractStorage import AbstractStorage
 import infrastructure.storage.gcs.gcs_config as gcs_config
 from config import resource_tags
 
 
 class GoogleCloudStorage(AbstractStorage):
+    BUCKET_RESOURCE_TYPE = "gcp:storage/bucket:Bucket"
+    LIFECYCLE_CONDITION_KEYS = ["age", "matches_prefixes", "matches_suffixes", "with_state", "days_since_noncurrent_time", "num_newer_versions"]
 
     def __init__(self, storage_id: str, storage_config: dict, project: organizations.Project, parent) -> None:
+        super().__init__()
         self._parent = parent
         self._project_id = project.project_id
 
         self.project_id = storage_config["projectID"]
+        self._discovery = storage_config.get("discovery", False) is True
         self.buckets = {}
 
     # interface methods
+    def lookup_existing_resources(self, buckets_config: dict):
+        lookups = {self._bucket_key(bucket_name): partial(self._get_bucket, bucket_name) for bucket_name in buckets_config}
+
+        discovered_keys = self.discover_resources(self.project_id, lookups, self._discover_resources) if self._discovery else None
+        self.lookup_resources(lookups, discovered_keys)
+
     def add_bucket(self, bucket_name: str, bucket_config: dict):
-        bucket_data = self._get_bucket(bucket_name)
+        bucket_data = self.lookup_resource(self._bucket_key(bucket_name), partial(self._get_bucket, bucket_name))
+        if isinstance(bucket_data, StackState.ManagedResource):
+            bucket_data = ResourceCreator._managed_resource_data(bucket_data, gcs_config.bucket_config)
+        if bucket_data is not None:
+            # lifecycle rules are configured flat, existing rules are compared in the same shape
+            lifecycle_rules = GoogleCloudStorage._get_lifecycle_rules(getattr(bucket_data, "lifecycle_rules", None))
+            bucket_data = SimpleNamespace(**{**vars(bucket_data), "lifecycle_rules": lifecycle_rules})
 
         if resource_tags and not bucket_config.get("labels"):
             bucket_config["labels"] = resource_tags
@@ -49,6 +69,14 @@ class GoogleCloudStorage(AbstractStorage):
         return platform_config
 
     # internal methods
+    def _discover_resources(self) -> set[str]:
+        from google.cloud import storage as gcs
+
+        return {self._bucket_key(bucket.name) for bucket in gcs.Client(project=self.project_id).list_buckets()}
+
+    def _bucket_key(self, bucket_name: str) -> str:
+        return self.resource_key(GoogleCloudStorage.BUCKET_RESOURCE_TYPE, bucket_name)
+
     def _get_bucket(self, bucket_name: str) -> storage.Bucket:
         try:
             bucket_data = storage.get_bucket(
@@ -58,7 +86,27 @@ class GoogleCloudStorage(AbstractStorage):
             bucket_data = None
         return bucket_data
 
+    @staticmethod
+    def _get_lifecycle_rules(retrieved_rules) -> list[dict]:
+        # Provider lookups return the action and condition of a rule as lists, the stack state as objects
+        def first(block):
+            if isinstance(block, list):
+                return block[0] if block else {}
+            return block or {}
+
+        lifecycle_rules = []
+        for rule in retrieved_rules or []:
+            action = first(rule.get("actions", rule.get("action")))
+            condition = first(rule.get("conditions", rule.get("condition")))
+            lifecycle_rule = {"action": action.get("type"), "storage_class": action.get("storage_class")}
+            lifecycle_rule.update({key: condition.get(key) for key in GoogleCloudStorage.LIFECYCLE_CONDITION_KEYS})
+            # unset conditions are reported as empty values
+            lifecycle_rules.append({key: value for key, value in lifecycle_rule.items() if value not in (None, "", [], 0)})
+        return lifecycle_rules
+
     def _create_bucket(self, bucket_name: str, bucket_config: ResourceCreator.ResourceConfigProperties, opts: ResourceOptions) -> storage.Bucket:
+        rule_defaults = ResourceCreator.dict_list_to_snake_case([gcs_config.lifecycle_rule_properties])[0]
+        lifecycle_rules = [{**rule_defaults, **rule} for rule in bucket_config.lifecycle_rules or [] if rule.get("action")]
         return storage.Bucket(
             resource_name=bucket_name,
             name=bucket_name,
@@ -66,6 +114,32 @@ class GoogleCloudStorage(AbstractStorage):
             location=bucket_config.location,
             public_access_prevention=bucket_config.public_access_prevention,
             uniform_bucket_level_access=bucket_config.uniform_bucket_level_access,
+            storage_class=bucket_config.storage_class,
+            autoclass=storage.BucketAutoclassArgs(
+                enabled=bucket_config.autoclasses[0].get("enabled"),
+            ) if bucket_config.autoclasses and bucket_config.autoclasses[0].get("enabled") is not None else None,
+            versioning=storage.BucketVersioningArgs(
+                enabled=bucket_config.versionings[0].get("enabled"),
+            ) if bucket_config.versionings and bucket_config.versionings[0].get("enabled") is not None else None,
+            custom_placement_config=storage.BucketCustomPlacementConfigArgs(
+                data_locations=bucket_config.custom_placement_configs[0].get("data_locations"),
+            ) if bucket_config.custom_placement_configs and bucket_config.custom_placement_configs[0].get("data_locations") else None,
+            lifecycle_rules=[
+                storage.BucketLifecycleRuleArgs(
+                    action=storage.BucketLifecycleRuleActionArgs(
+                        type=rule["action"],
+                        storage_class=rule["storage_class"],
+                    ),
+                    condition=storage.BucketLifecycleRuleConditionArgs(
+                        age=rule["age"],
+                        matches_prefixes=rule["matches_prefixes"],
+                        matches_suffixes=rule["matches_suffixes"],
+                        with_state=rule["with_state"],
+                        days_since_noncurrent_time=rule["days_since_noncurrent_time"],
+                        num_newer_versions=rule["num_newer_versions"],
+                    ),
+                ) for rule in lifecycle_rules
+            ] if lifecycle_rules else None,
             labels=bucket_config.labels,
             opts=opts
         )
@@ -12,9 +12,31 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+lifecycle_rule_properties = {
+    "action": None, # [Delete, SetStorageClass, AbortIncompleteMultipartUpload]
+    "storageClass": None,
+    "age": None,
+    "matchesPrefixes": None,
+    "matchesSuffixes": None,
+    "withState": None, # [LIVE, ARCHIVED, ANY]
+    "daysSinceNoncurrentTime": None,
+    "numNewerVersions": None,
+}
+
 bucket_config = {
     "location": "europe-west2",
     "publicAccessPrevention": "enforced", # [enforced, inherited]
     "uniformBucketLevelAccess": True,
+    "storageClass": None, # [STANDARD, NEARLINE, COLDLINE, ARCHIVE]
+    "autoclasses": [{
+        "enabled": None,
+    }],
+    "versionings": [{
+        "enabled": None,
+    }],
+    "customPlacementConfigs": [{
+        "dataLocations": None, # regions of a configurable dual-region location
+    }],
+    "lifecycleRules": [lifecycle_rule_properties],
     "labels": None,
 }
@@ -0,0 +1,190 @@
+# Copyright 2024 Syntio Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+import pulumi
+
+import config
+
+SERVICE_NAME = "dataphos-pulumi"
+
+_lock = threading.Lock()
+_trace_id = secrets.token_hex(16)
+_root_span = None
+_phase_stack = []
+_spans = []
+_lookup_sources = {}
+_resource_actions = {}
+_tracked_outputs = []
+
+
+def _new_span(name: str, parent: dict, attributes: dict = None) -> dict:
+    span = {
+        "name": name,
+        "spanId": secrets.token_hex(8),
+        "parentSpanId": parent["spanId"] if parent else None,
+        "start": time.time_ns(),
+        "end": None,
+        "attributes": attributes or {},
+    }
+    with _lock:
+        _spans.append(span)
+    return span
+
+
+def _get_root_span() -> dict:
+    global _root_span
+    if _root_span is None:
+        _root_span = _new_span("pulumi program", None, {"stack": pulumi.get_stack(), "dryRun": pulumi.runtime.is_dry_run()})
+    return _root_span
+
+
+def _current_span() -> dict:
+    # Lookup workers run while the main thread waits inside a phase, so the innermost phase is their parent
+    return _phase_stack[-1] if _phase_stack else _get_root_span()
+
+
+@contextmanager
+def phase(name: str):
+    span = _new_span(name, _current_span())
+    _phase_stack.append(span)
+    try:
+        yield span
+    finally:
+        _phase_stack.pop()
+        span["end"] = time.time_ns()
+
+
+def record_lookup(resource_key: str, start: int, end: int):
+    # Latency of a get function call issued to the cloud provider
+    span = _new_span("lookup", _current_span(), {"resource": resource_key})
+    span["start"] = start
+    span["end"] = end
+    record_lookup_source("provider")
+
+
+def record_lookup_source(source: str):
+    with _lock:
+        _lookup_sources[source] = _lookup_sources.get(source, 0) + 1
+
+
+def record_resource(action: str):
+    with _lock:
+        _resource_actions[action] = _resource_actions.get(action, 0) + 1
+
+
+def track(name: str, output: pulumi.Output):
+    # Asynchronous work such as chart rendering finishes when its output resolves
+    span = _new_span(name, _current_span())
+
+    def finish(value):
+        span["end"] = time.time_ns()
+        return value
+
+    _tracked_outputs.append(output.apply(finish))
+
+
+def _duration_seconds(span: dict) -> float:
+    end = span["end"] or time.time_ns()
+    return round((end - span["start"]) / 1e9, 3)
+
+
+def get_metrics() -> dict:
+    lookups = [span for span in _spans if span["name"] == "lookup"]
+    lookup_latencies = sorted(_duration_seconds(span) for span in lookups)
+    return {
+        "wallTime": _duration_seconds(_get_root_span()),
+        "phases": {
+            span["name"]: _duration_seconds(span)
+            for span in _spans if span["name"] != "lookup" and span is not _root_span
+        },
+        "lookups": {
+            "sources": dict(_lookup_sources),
+            "count": len(lookup_latencies),
+            "totalTime": round(sum(lookup_latencies), 3),
+            "maxTime": lookup_latencies[-1] if lookup_latencies else 0,
+            "slowest": {
+                span["attributes"]["resource"]: _duration_seconds(span)
+                for span in sorted(lookups, key=_duration_seconds, reverse=True)[:10]
+            },
+        },
+        "resources": dict(_resource_actions),
+    }
+
+
+def _otlp_attributes(attributes: dict) -> list[dict]:
+    otlp_attributes = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            otlp_value = {"boolValue": value}
+        elif isinstance(value, int):
+            otlp_value = {"intValue": str(value)}
+        else:
+            otlp_value = {"stringValue": str(value)}
+        otlp_attributes.append({"key": key, "value": otlp_value})
+    return otlp_attributes
+
+
+def _otlp_trace() -> dict:
+    # OTLP/JSON encoding of the recorded spans, can be sent to any OpenTelemetry collector
+    spans = []
+    for span in _spans:
+        otlp_span = {
+            "traceId": _trace_id,
+            "spanId": span["spanId"],
+            "name": span["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(span["start"]),
+            "endTimeUnixNano": str(span["end"] or time.time_ns()),
+            "attributes": _otlp_attributes(span["attributes"]),
+        }
+        if span["parentSpanId"]:
+            otlp_span["parentSpanId"] = span["parentSpanId"]
+        spans.append(otlp_span)
+
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME, "pulumi.stack": pulumi.get_stack()})},
+            "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": spans}],
+        }],
+    }
+
+
+def _write_trace_file(trace_file: str, trace_format: str):
+    trace = _otlp_trace() if trace_format == "otlp" else get_metrics()
+    os.makedirs(os.path.dirname(trace_file) or ".", exist_ok=True)
+    with open(trace_file, "w") as f:
+        json.dump(trace, f, indent=2)
+
+
+def export_metrics():
+    instrumentation_config = config.instrumentation
+    if not instrumentation_config or instrumentation_config.get("enabled", True) is not True: return
+
+    _get_root_span()["end"] = time.time_ns()
+
+    def finish(_):
+        _root_span["end"] = max(_root_span["end"], *(span["end"] or 0 for span in _spans))
+        trace_file = instrumentation_config.get("traceFile")
+        if trace_file:
+            _write_trace_file(trace_file, instrumentation_config.get("traceFormat", "json"))
+        return get_metrics()
+
+    pulumi.export("deploymentMetrics", pulumi.Output.all(*_tracked_outputs).apply(finish))
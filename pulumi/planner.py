@@ -0,0 +1,303 @@
+# Copyright 2024 Syntio Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import pulumi
+import yaml
+
+PROGRAM_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Platform config the charts receive from the deployed brokers, storage and accounts
+BROKER_EXPORTED_KEYS = {
+    "kafka": ["brokerAddr"],
+    "pubsub": ["projectID"],
+    "servicebus": ["connectionString"],
+}
+STORAGE_EXPORTED_KEYS = {
+    "gcs": ["projectID"],
+    "abs": ["accountStorageID"],
+}
+ACCOUNT_EXPORTED_KEYS = {
+    "GCP": ["serviceAccountSecret", "serviceAccountKey"],
+    "AZURE": ["clientID", "clientSecret", "tenantID"],
+}
+
+# Kafka topics read or written by the product instances, (broker key, topic key) of the instance config
+KAFKA_TOPIC_REFERENCES = {
+    "validator": [("broker", "topic"), ("destinationBroker", "validTopic"), ("destinationBroker", "deadletterTopic")],
+    "persistor": [("broker", "topic")],
+    "indexer": [("broker", "topic"), ("broker", "deadletterTopic")],
+}
+
+
+def get_project_name() -> str:
+    with open(os.path.join(PROGRAM_DIR, "Pulumi.yaml")) as f:
+        return yaml.safe_load(f)["name"]
+
+
+def get_stack_name(stack_file: str) -> str:
+    # stack config files are named Pulumi.<stack>.yaml
+    file_name = os.path.basename(stack_file)
+    return file_name[len("Pulumi."):-len(".yaml")] if file_name.startswith("Pulumi.") else os.path.splitext(file_name)[0]
+
+
+def load_stack_config(stack_file: str, project_name: str) -> dict:
+    with open(stack_file) as f:
+        stack_config = (yaml.safe_load(f) or {}).get("config") or {}
+    return {
+        key if ":" in key else f"{project_name}:{key}": value if isinstance(value, str) else json.dumps(value)
+        for key, value in stack_config.items()
+    }
+
+
+def load_config(stack_file: str):
+    # config.py is evaluated with the stack config, without the Pulumi engine
+    project_name = get_project_name()
+    os.chdir(PROGRAM_DIR)
+    sys.path.insert(0, PROGRAM_DIR)
+    pulumi.runtime.settings.configure(pulumi.runtime.settings.Settings(project=project_name, stack=get_stack_name(stack_file), dry_run=True))
+    pulumi.runtime.set_all_config(load_stack_config(stack_file, project_name))
+    sys.modules.pop("config", None)
+    import config
+    return config
+
+
+def _placeholder_config(exported_keys: list[str], resource_id: str, resource_config: dict) -> dict:
+    return {key: resource_config.get(key) or f"<{key} of {resource_id}>" for key in exported_keys}
+
+
+def plan_resources(config) -> dict:
+    resources = {}
+
+    for cluster_id, cluster_config in (config.cluster or {}).items():
+        resources[f"cluster/{cluster_id}"] = {"type": cluster_config["type"]}
+
+    for broker_id, broker_config in config.brokers.items():
+        resources[f"broker/{broker_id}"] = {
+            "type": broker_config["type"],
+            "external": bool(broker_config.get("bootstrapServers")),
+        }
+        for topic_name, topic_config in broker_config.get("topics", {}).items():
+            resources[f"topic/{broker_id}/{topic_name}"] = {key: value for key, value in topic_config.items() if key != "subscriptions"}
+            # Kafka consumer groups are not created by the stack
+            if broker_config["type"] == "kafka": continue
+            for subscription_name, subscription_config in topic_config.get("subscriptions", {}).items():
+                resources[f"subscription/{broker_id}/{topic_name}/{subscription_name}"] = subscription_config
+
+    for storage_id, storage_config in config.storage.items():
+        resources[f"storage/{storage_id}"] = {"type": storage_config["type"]}
+        for bucket_name, bucket_config in storage_config.get("buckets", {}).items():
+            resources[f"bucket/{storage_id}/{bucket_name}"] = bucket_config
+
+    for app_id, account_config in config.accounts.items():
+        resources[f"account/{app_id}"] = {"platform": account_config["platform"].name}
+
+    for chart_name, values in plan_chart_values(config).items():
+        resources[f"chart/{chart_name}"] = values
+
+    for component, instances in config.autoscaling.items():
+        for instance_id, instance_config in instances.items():
+            resources[f"scaledObject/{component}/{instance_id}"] = instance_config
+
+    return resources
+
+
+def plan_chart_values(config) -> dict:
+    import products.persistor as persistor
+    import products.schema_registry as schema_registry
+    import products.schema_registry_validator as schema_registry_validator
+
+    namespace = SimpleNamespace(_name=config.namespace)
+    brokers_platform_config = {
+        broker_id: _placeholder_config(BROKER_EXPORTED_KEYS[broker_config["type"]], broker_id, broker_config)
+        for broker_id, broker_config in config.brokers.items()
+    }
+    storage_platform_config = {
+        storage_id: _placeholder_config(STORAGE_EXPORTED_KEYS[storage_config["type"]], storage_id, storage_config)
+        for storage_id, storage_config in config.storage.items()
+    }
+    account_platform_config = {
+        app_id: _placeholder_config(ACCOUNT_EXPORTED_KEYS[account_config["platform"].name], app_id, {})
+        for app_id, account_config in config.accounts.items()
+    }
+
+    chart_values = {}
+    schema_registry_svc_name = None
+    if config.deploy_schema_registry:
+        chart_values["dataphos-schema-registry"] = schema_registry.create_chart_values(config.schema_registry_chart_config, namespace)
+        schema_registry_svc_name = chart_values["dataphos-schema-registry"]["registrySvcName"]
+    if config.deploy_persistor:
+        chart_values["dataphos-persistor"] = persistor.create_chart_values(config.persistor_chart_config, brokers_platform_config, storage_platform_config, account_platform_config, namespace)
+    if config.deploy_schema_registry_validator:
+        chart_values["dataphos-schema-registry-validator"] = schema_registry_validator.create_chart_values(config.schema_registry_validator_chart_config, schema_registry_svc_name, brokers_platform_config, account_platform_config, namespace)
+    return chart_values
+
+
+def plan_role_bindings(config) -> list[dict]:
+    from infrastructure.accounts.AccountRoleScope import AccountRoleScope
+    from infrastructure.accounts.service_account import service_account_config
+    from infrastructure.accounts.service_principal import service_principal_config
+
+    role_definitions = {
+        "GCP": service_account_config.ROLE_DEFINITIONS,
+        "AZURE": service_principal_config.ROLE_DEFINITIONS,
+    }
+
+    role_bindings = []
+    for app_id, account_config in config.accounts.items():
+        platform = account_config["platform"].name
+        for role_config in account_config["roles"]:
+            role_definition = role_definitions[platform].get(role_config["roleID"])
+            if role_definition is None: continue
+
+            if role_config.get("broker"):
+                resource_id = role_config["broker"]
+                if role_config["scope"] == AccountRoleScope.PROJECT:
+                    targets = [f"broker/{resource_id}"]
+                else:
+                    targets = [f"topic/{resource_id}/{role_config['topic']}"]
+                    if role_config.get("consumerID"):
+                        targets.append(f"subscription/{resource_id}/{role_config['topic']}/{role_config['consumerID']}")
+            else:
+                resource_id = role_config["storage"]
+                if role_config["scope"] == AccountRoleScope.PROJECT:
+                    targets = [f"storage/{resource_id}"]
+                else:
+                    targets = [f"bucket/{resource_id}/{role_config['storageTargetID']}"]
+
+            for target in targets:
+                role_bindings.append({"account": app_id, "role": role_definition["id"], "roleName": role_definition["name"], "target": target})
+
+    # the same role can be requested more than once for an account, e.g. the broker viewer role
+    unique_bindings = {_binding_key(role_binding): role_binding for role_binding in role_bindings}
+    return list(unique_bindings.values())
+
+
+def _binding_key(role_binding: dict) -> str:
+    return f"{role_binding['account']} {role_binding['role']} {role_binding['target']}"
+
+
+def validate(config, resources: dict, role_bindings: list[dict]) -> list[str]:
+    errors = []
+
+    # role bindings are attached to the topics, subscriptions and buckets declared in the config
+    for role_binding in role_bindings:
+        target = role_binding["target"]
+        if target in resources: continue
+        kind, resource_id, *path = target.split("/")
+        resource_path = "/".join(path)
+        if kind == "subscription":
+            errors.append(f"Account <{role_binding['account']}> consumes from subscription <{path[1]}> that is not declared under topic <{path[0]}> of broker <{resource_id}>")
+        elif kind == "topic":
+            errors.append(f"Account <{role_binding['account']}> uses topic <{resource_path}> that is not declared under broker <{resource_id}>")
+        elif kind == "bucket":
+            errors.append(f"Account <{role_binding['account']}> uses bucket <{resource_path}> that is not declared under storage <{resource_id}>")
+
+    # Kafka topics are not covered by role bindings, they need to exist in the cluster deployed by the stack
+    chart_configs = {}
+    if config.deploy_persistor:
+        chart_configs.update({component: config.persistor_chart_config.get(component) or {} for component in ("persistor", "indexer")})
+    if config.deploy_schema_registry_validator:
+        chart_configs["validator"] = config.schema_registry_validator_chart_config.get("validator") or {}
+    for component, instances in chart_configs.items():
+        for instance_id, instance_config in instances.items():
+            for broker_key, topic_key in KAFKA_TOPIC_REFERENCES[component]:
+                broker_id, topic_name = instance_config.get(broker_key), instance_config.get(topic_key)
+                if not broker_id or not topic_name: continue
+                broker_config = config.brokers.get(broker_id)
+                if broker_config is None:
+                    errors.append(f"Instance <{instance_id}> of {component} references broker <{broker_id}> that is not declared")
+                elif broker_config["type"] == "kafka" and not broker_config.get("bootstrapServers") and f"topic/{broker_id}/{topic_name}" not in resources:
+                    errors.append(f"Instance <{instance_id}> of {component} uses topic <{topic_name}> that is not declared under broker <{broker_id}>")
+
+    # an account can have several roles on the same resource
+    return list(dict.fromkeys(errors))
+
+
+def diff_plans(previous_plan: dict, plan: dict) -> dict:
+    previous_resources, resources = previous_plan.get("resources", {}), plan["resources"]
+    previous_bindings = {_binding_key(role_binding) for role_binding in previous_plan.get("roleBindings", [])}
+    bindings = {_binding_key(role_binding) for role_binding in plan["roleBindings"]}
+    return {
+        "resources": {
+            "added": sorted(set(resources) - set(previous_resources)),
+            "removed": sorted(set(previous_resources) - set(resources)),
+            "changed": sorted(key for key in set(resources) & set(previous_resources) if resources[key] != previous_resources[key]),
+        },
+        "roleBindings": {
+            "added": sorted(bindings - previous_bindings),
+            "removed": sorted(previous_bindings - bindings),
+        },
+    }
+
+
+def create_plan(stack_file: str) -> dict:
+    try:
+        config = load_config(stack_file)
+    except Exception as e:
+        # config.py indexes the brokers, storage and instances it references
+        return {"resources": {}, "roleBindings": [], "errors": [f"Invalid stack config: {type(e).__name__}: {e}"]}
+
+    resources = plan_resources(config)
+    role_bindings = plan_role_bindings(config)
+    return {
+        "resources": resources,
+        "roleBindings": role_bindings,
+        "errors": validate(config, resources, role_bindings),
+    }
+
+
+def print_diff(diff: dict):
+    for section, changes in diff.items():
+        for action, keys in changes.items():
+            for key in keys:
+                print(f"  {section} {action}: {key}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan the resources and role bindings of a Dataphos stack config without the Pulumi engine.")
+    parser.add_argument("stack_file", help="stack config file, e.g. Pulumi.dev.yaml")
+    parser.add_argument("--previous", help="previous plan file to diff the plan against")
+    parser.add_argument("--output", help="write the plan to a JSON file")
+    args = parser.parse_args()
+
+    stack_file = os.path.abspath(args.stack_file)
+    start_time = time.perf_counter()
+    plan = create_plan(stack_file)
+    if args.previous:
+        with open(args.previous) as f:
+            plan["diff"] = diff_plans(json.load(f), plan)
+    elapsed_ms = round((time.perf_counter() - start_time) * 1000, 1)
+
+    print(f"Planned {len(plan['resources'])} resources and {len(plan['roleBindings'])} role bindings in {elapsed_ms} ms")
+    if "diff" in plan:
+        print("Changes against the previous plan:")
+        print_diff(plan["diff"])
+    for error in plan["errors"]:
+        print(f"error: {error}", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(plan, f, indent=2, default=str)
+    sys.exit(1 if plan["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# Copyright 2024 Syntio Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from pulumi import Output, ResourceOptions
+from pulumi_kubernetes.apiextensions import CustomResource
+from pulumi_kubernetes.core.v1 import Namespace, Secret
+
+KEDA_API_VERSION = "keda.sh/v1alpha1"
+
+autoscaling_properties = {
+    "minReplicas": 1,
+    "maxReplicas": 10,
+    # consumer group lag, undelivered messages or active messages per replica
+    "target": 1000,
+    "pollingInterval": 30,
+    "cooldownPeriod": 300,
+    "scaleTargetName": None,
+    "authenticationRef": None,
+}
+
+# Deployments of the product instances, as named by the Dataphos charts
+SCALE_TARGET_NAMES = {
+    "persistor": "{instance_id}",
+    "indexer": "{instance_id}-consumer",
+    "validator": "{instance_id}",
+}
+
+_trigger_authentications = {}
+
+
+def get_scale_target_names(autoscaling_config: dict, component: str) -> set[str]:
+    return {
+        _get_scale_target_name(component, instance_id, instance_config)
+        for instance_id, instance_config in autoscaling_config.get(component, {}).items()
+    }
+
+
+def ignore_scaled_replicas(scale_target_names: set[str]):
+    # Replica counts of autoscaled deployments are owned by KEDA and are not reset by later updates
+    def transformation(obj, opts):
+        if obj.get("kind") == "Deployment" and obj.get("metadata", {}).get("name") in scale_target_names:
+            opts.ignore_changes = (opts.ignore_changes or []) + ["spec.replicas"]
+    return transformation
+
+
+def create_scaled_objects(autoscaling_config: dict, component: str, brokers: dict, brokers_platform_config: dict, namespace: Namespace, depends_on: list = None) -> list[CustomResource]:
+    scaled_objects = []
+    for instance_id, instance_config in autoscaling_config.get(component, {}).items():
+        instance_config = {**autoscaling_properties, **instance_config}
+        broker_id = instance_config["broker"]
+        broker_config = brokers[broker_id]
+
+        authentication_ref = instance_config["authenticationRef"] or _get_trigger_authentication(broker_id, broker_config, brokers_platform_config.get(broker_id, {}), namespace)
+        trigger = _get_trigger(broker_config, brokers_platform_config.get(broker_id, {}), instance_config)
+        if authentication_ref:
+            trigger["authenticationRef"] = {"name": authentication_ref}
+
+        scaled_object_name = f"{instance_id}-{component}-scaler"
+        scaled_objects.append(CustomResource(
+            scaled_object_name,
+            api_version=KEDA_API_VERSION,
+            kind="ScaledObject",
+            metadata={
+                "name": scaled_object_name,
+                "namespace": namespace._name,
+            },
+            spec={
+                "scaleTargetRef": {"name": _get_scale_target_name(component, instance_id, instance_config)},
+                "minReplicaCount": instance_config["minReplicas"],
+                "maxReplicaCount": instance_config["maxReplicas"],
+                "pollingInterval": instance_config["pollingInterval"],
+                "cooldownPeriod": instance_config["cooldownPeriod"],
+                "triggers": [trigger],
+            },
+            opts=ResourceOptions(parent=namespace, depends_on=depends_on),
+        ))
+    return scaled_objects
+
+
+def _get_scale_target_name(component: str, instance_id: str, instance_config: dict) -> str:
+    return instance_config.get("scaleTargetName") or SCALE_TARGET_NAMES[component].format(instance_id=instance_id)
+
+
+def _get_trigger(broker_config: dict, broker_platform_config: dict, instance_config: dict) -> dict:
+    broker_type = broker_config["type"]
+    if broker_type == "kafka":
+        return {
+            "type": "kafka",
+            "metadata": {
+                "bootstrapServers": broker_platform_config["brokerAddr"],
+                "consumerGroup": instance_config["consumerID"],
+                "topic": instance_config["topic"],
+                "lagThreshold": str(instance_config["target"]),
+            },
+        }
+    elif broker_type == "pubsub":
+        return {
+            "type": "gcp-pubsub",
+            "metadata": {
+                "subscriptionName": f"projects/{broker_config['projectID']}/subscriptions/{instance_config['consumerID']}",
+                "mode": "SubscriptionSize",
+                "value": str(instance_config["target"]),
+            },
+        }
+    elif broker_type == "servicebus":
+        return {
+            "type": "azure-servicebus",
+            "metadata": {
+                "topicName": instance_config["topic"],
+                "subscriptionName": instance_config["consumerID"],
+                "messageCount": str(instance_config["target"]),
+            },
+        }
+
+
+def _get_trigger_authentication(broker_id: str, broker_config: dict, broker_platform_config: dict, namespace: Namespace) -> str:
+    # Instances consuming from the same broker share its trigger authentication
+    if broker_id not in _trigger_authentications:
+        _trigger_authentications[broker_id] = _create_trigger_authentication(broker_id, broker_config, broker_platform_config, namespace)
+    return _trigger_authentications[broker_id]
+
+
+def _create_trigger_authentication(broker_id: str, broker_config: dict, broker_platform_config: dict, namespace: Namespace) -> str:
+    authentication_name = f"{broker_id}-keda-auth"
+    broker_type = broker_config["type"]
+    if broker_type == "pubsub":
+        # the KEDA operator reads the Cloud Monitoring metrics with its GKE workload identity
+        spec = {"podIdentity": {"provider": "gcp"}}
+    elif broker_type == "servicebus":
+        secret_name = f"{broker_id}-keda-servicebus"
+        Secret(
+            secret_name,
+            metadata={
+                "name": secret_name,
+                "namespace": namespace._name,
+            },
+            string_data={"connection": Output.secret(broker_platform_config["connectionString"])},
+            opts=ResourceOptions(parent=namespace),
+        )
+        spec = {"secretTargetRef": [{"parameter": "connection", "name": secret_name, "key": "connection"}]}
+    else:
+        return None
+
+    CustomResource(
+        authentication_name,
+        api_version=KEDA_API_VERSION,
+        kind="TriggerAuthentication",
+        metadata={
+            "name": authentication_name,
+            "namespace": namespace._name,
+        },
+        spec=spec,
+        opts=ResourceOptions(parent=namespace),
+    )
+    return authentication_name
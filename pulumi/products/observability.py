@@ -0,0 +1,195 @@
+# Copyright 2024 Syntio Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+from pulumi import ResourceOptions
+from pulumi_kubernetes.apiextensions import CustomResource
+from pulumi_kubernetes.core.v1 import ConfigMap, Namespace
+
+import config
+import infrastructure.broker.kafka.kafka_config as kafka_config
+
+MONITORING_API_VERSION = "monitoring.coreos.com/v1"
+
+observability_properties = {
+    "enabled": True,
+    "scrapeInterval": "30s",
+    # labels the Prometheus instance selects monitors by, e.g. release: kube-prometheus-stack
+    "monitorLabels": {},
+    # labels the Grafana dashboard sidecar selects config maps by
+    "dashboardLabels": {"grafana_dashboard": "1"},
+    "dashboardNamespace": None,
+    "productMetricsPort": 2112,
+    "productMetricsPath": "/metrics",
+    "productSelector": {},
+}
+
+# Product components consuming a topic, by the chart config they are declared in
+CONSUMER_COMPONENTS = {
+    "dataphos-persistor": ["persistor", "indexer"],
+    "dataphos-schema-registry-validator": ["validator"],
+}
+
+
+def get_kafka_clusters() -> dict:
+    # Kafka clusters deployed by the stack, external clusters are not monitored
+    return {
+        broker_id: {
+            "clusterName": broker_config.get("clusterName", kafka_config.cluster_properties["clusterName"]),
+            "clusterNamespace": broker_config.get("clusterNamespace", kafka_config.cluster_properties["clusterNamespace"]),
+            "strimziOperatorNamespace": broker_config.get("strimziOperatorNamespace", kafka_config.cluster_properties["strimziOperatorNamespace"]),
+        }
+        for broker_id, broker_config in config.brokers.items()
+        if broker_config["type"] == "kafka" and not broker_config.get("bootstrapServers")
+    }
+
+
+def get_consumers() -> list[dict]:
+    chart_configs = {}
+    if config.deploy_persistor:
+        chart_configs["dataphos-persistor"] = config.persistor_chart_config
+    if config.deploy_schema_registry_validator:
+        chart_configs["dataphos-schema-registry-validator"] = config.schema_registry_validator_chart_config
+
+    consumers = []
+    for chart_name, chart_config in chart_configs.items():
+        for component in CONSUMER_COMPONENTS[chart_name]:
+            for instance_id, instance_config in chart_config.get(component, {}).items():
+                consumers.append({
+                    "component": component,
+                    "instanceID": instance_id,
+                    "broker": instance_config["broker"],
+                    "topic": instance_config["topic"],
+                    "consumerID": instance_config["consumerID"],
+                })
+    return consumers
+
+
+def create_observability(observability_config: dict, namespace: Namespace) -> list:
+    observability_config = {**observability_properties, **observability_config}
+    if observability_config["enabled"] is not True: return []
+
+    kafka_clusters = get_kafka_clusters()
+    consumers = get_consumers()
+
+    resources = []
+    operator_namespaces = set()
+    for broker_id, kafka_cluster in kafka_clusters.items():
+        # Kafka, ZooKeeper and Kafka Exporter pods all expose their metrics on the tcp-prometheus port
+        resources.append(_create_pod_monitor(f"{broker_id}-kafka-monitor", observability_config, namespace, kafka_cluster["clusterNamespace"],
+            {"strimzi.io/cluster": kafka_cluster["clusterName"]},
+            {"port": "tcp-prometheus", "path": "/metrics"}))
+        if kafka_cluster["strimziOperatorNamespace"] not in operator_namespaces:
+            operator_namespaces.add(kafka_cluster["strimziOperatorNamespace"])
+            resources.append(_create_pod_monitor(f"{kafka_cluster['strimziOperatorNamespace']}-strimzi-monitor", observability_config, namespace, kafka_cluster["strimziOperatorNamespace"],
+                {"strimzi.io/kind": "cluster-operator"},
+                {"port": "http", "path": "/metrics"}))
+
+    if consumers:
+        resources.append(_create_pod_monitor("dataphos-products-monitor", observability_config, namespace, config.namespace,
+            observability_config["productSelector"],
+            {"targetPort": observability_config["productMetricsPort"], "path": observability_config["productMetricsPath"]}))
+
+    if kafka_clusters:
+        dashboards = {
+            f"kafka-{broker_id}.json": json.dumps(get_kafka_dashboard(broker_id, kafka_cluster, [c for c in consumers if c["broker"] == broker_id]))
+            for broker_id, kafka_cluster in kafka_clusters.items()
+        }
+        resources.append(ConfigMap(
+            "dataphos-kafka-dashboards",
+            metadata={
+                "name": "dataphos-kafka-dashboards",
+                "namespace": observability_config["dashboardNamespace"] or namespace._name,
+                "labels": observability_config["dashboardLabels"],
+            },
+            data=dashboards,
+            opts=ResourceOptions(parent=namespace),
+        ))
+    return resources
+
+
+def _create_pod_monitor(name: str, observability_config: dict, namespace: Namespace, target_namespace: str, match_labels: dict, endpoint: dict) -> CustomResource:
+    return CustomResource(
+        name,
+        api_version=MONITORING_API_VERSION,
+        kind="PodMonitor",
+        metadata={
+            "name": name,
+            "namespace": namespace._name,
+            "labels": observability_config["monitorLabels"],
+        },
+        spec={
+            "namespaceSelector": {"matchNames": [target_namespace]},
+            "selector": {"matchLabels": match_labels},
+            "podMetricsEndpoints": [{**endpoint, "interval": observability_config["scrapeInterval"]}],
+        },
+        opts=ResourceOptions(parent=namespace),
+    )
+
+
+def get_kafka_dashboard(broker_id: str, kafka_cluster: dict, consumers: list[dict]) -> dict:
+    selector = f'namespace="{kafka_cluster["clusterNamespace"]}"'
+    panels = [
+        _panel("Broker throughput in", "Bps", [
+            (f"sum by (pod) (rate(kafka_server_brokertopicmetrics_bytesin_total{{{selector}}}[5m]))", "{{pod}}"),
+        ]),
+        _panel("Broker throughput out", "Bps", [
+            (f"sum by (pod) (rate(kafka_server_brokertopicmetrics_bytesout_total{{{selector}}}[5m]))", "{{pod}}"),
+        ]),
+        _panel("Messages in", "short", [
+            (f"sum by (topic) (rate(kafka_server_brokertopicmetrics_messagesin_total{{{selector},topic!=\"\"}}[5m]))", "{{topic}}"),
+        ]),
+        _panel("Request latency p99", "ms", [
+            (f"max by (request) (kafka_network_requestmetrics_totaltimems{{{selector},quantile=\"0.99\",request=~\"Produce|FetchConsumer|FetchFollower\"}})", "{{request}}"),
+        ]),
+        _panel("Under-replicated partitions", "short", [
+            (f"sum(kafka_server_replicamanager_underreplicatedpartitions{{{selector}}})", "under-replicated"),
+            (f"sum(kafka_cluster_partition_underminisr{{{selector}}})", "under min ISR"),
+        ]),
+        _panel("Consumer lag", "short", [
+            (f"sum by (consumergroup, topic) (kafka_consumergroup_lag{{{selector},consumergroup=\"{consumer['consumerID']}\",topic=\"{consumer['topic']}\"}})",
+             f"{consumer['component']} {consumer['instanceID']} ({consumer['consumerID']})")
+            for consumer in consumers
+        ] or [
+            (f"sum by (consumergroup, topic) (kafka_consumergroup_lag{{{selector}}})", "{{consumergroup}} {{topic}}"),
+        ]),
+    ]
+    for index, panel in enumerate(panels):
+        panel["id"] = index + 1
+        panel["gridPos"] = {"h": 8, "w": 12, "x": (index % 2) * 12, "y": (index // 2) * 8}
+
+    return {
+        "uid": f"dataphos-kafka-{broker_id}"[:40],
+        "title": f"Dataphos Kafka {broker_id}",
+        "tags": ["dataphos", "kafka"],
+        "timezone": "browser",
+        "refresh": "30s",
+        "time": {"from": "now-1h", "to": "now"},
+        "schemaVersion": 38,
+        "panels": panels,
+    }
+
+
+def _panel(title: str, unit: str, queries: list[tuple]) -> dict:
+    return {
+        "type": "timeseries",
+        "title": title,
+        "datasource": {"type": "prometheus"},
+        "fieldConfig": {"defaults": {"unit": unit}, "overrides": []},
+        "targets": [
+            {"expr": expr, "legendFormat": legend, "refId": chr(ord("A") + index) if index < 26 else f"A{index}"}
+            for index, (expr, legend) in enumerate(queries)
+        ],
+    }
@@ -13,9 +13,14 @@
 # limitations under the License.
 
 from pulumi.resource import ResourceOptions
-from pulumi_kubernetes.helm.v3 import Chart, LocalChartOpts
+from pulumi_kubernetes.helm.v3 import LocalChartOpts
 from pulumi_kubernetes.core.v1 import Namespace
 
+from infrastructure.RenderedChart import RenderedChart
+from infrastructure.cluster.KubernetesCluster import KubernetesCluster
+
+WORKLOAD_KINDS = ["Deployment", "StatefulSet", "DaemonSet", "Job"]
+
 
 def update_values(values, config, component_name):
     for instance_id in values.get(component_name, {}):
@@ -24,12 +29,25 @@ def update_values(values, config, component_name):
     return values
 
 
-def deploy_chart(values, name, namespace: Namespace):
-    Chart(
+def place_on_node_pool(pool_name: str):
+    # Every workload of the chart is scheduled on the nodes of the node pool
+    node_selector, tolerations = KubernetesCluster.get_node_pool_placement(pool_name)
+
+    def transformation(obj, opts):
+        if obj.get("kind") not in WORKLOAD_KINDS: return
+        pod_spec = obj["spec"]["template"]["spec"]
+        pod_spec["nodeSelector"] = {**(pod_spec.get("nodeSelector") or {}), **node_selector}
+        pod_spec["tolerations"] = (pod_spec.get("tolerations") or []) + tolerations
+    return transformation
+
+
+def deploy_chart(values, name, namespace: Namespace, transformations: list = None) -> RenderedChart:
+    return RenderedChart(
         release_name=name,
         config=LocalChartOpts(
             path="../helm_charts/" + name,
             values=values,
+            transformations=transformations,
         ),
         opts=ResourceOptions(
             parent=namespace
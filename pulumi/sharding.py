@@ -0,0 +1,224 @@
+# Copyright 2024 Syntio Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from types import SimpleNamespace
+
+import pulumi
+from pulumi import Output, StackReference
+
+import config
+import instrumentation
+import infrastructure.builder as infrastructure
+
+PLATFORM_ROLE = "platform"
+BROKER_ROLE = "broker"
+STORAGE_ROLE = "storage"
+PRODUCTS_ROLE = "products"
+
+ROLE_TO_STACKS_KEY_MAP = {
+    BROKER_ROLE: "brokers",
+    STORAGE_ROLE: "storage",
+}
+
+# Keys of the platform config exported by every broker and storage type
+EXPORTED_CONFIG_KEYS = {
+    "kafka": ["brokerAddr"],
+    "pubsub": ["projectID"],
+    "servicebus": ["connectionString"],
+    "gcs": ["projectID"],
+    "abs": ["accountStorageID"],
+}
+SECRET_CONFIG_KEYS = {"connectionString"}
+
+_stack_references = {}
+
+
+def get_stack_name(shard_config: dict, role: str, instance_id: str = None) -> str:
+    stacks = shard_config.get("stacks", {})
+    if role == PLATFORM_ROLE:
+        stack_name = stacks.get(PLATFORM_ROLE)
+    else:
+        stack_name = stacks.get(ROLE_TO_STACKS_KEY_MAP[role], {}).get(instance_id)
+    if stack_name:
+        return stack_name
+
+    stack_prefix = shard_config.get("stackPrefix")
+    if not stack_prefix:
+        raise pulumi.RunError(f"Stack of the {role} shard <{instance_id or role}> is not configured, set shard.stacks or shard.stackPrefix")
+    return f"{stack_prefix}-{role}" if instance_id is None else f"{stack_prefix}-{role}-{instance_id}"
+
+
+def get_stack_reference(shard_config: dict, role: str, instance_id: str = None) -> StackReference:
+    stack_name = get_stack_name(shard_config, role, instance_id)
+    stack_reference = _stack_references.get(stack_name)
+    if stack_reference is None:
+        stack_reference = StackReference(stack_name)
+        _stack_references[stack_name] = stack_reference
+    return stack_reference
+
+
+def _resource_reference(resource) -> dict:
+    return {
+        "name": getattr(resource, "name", None),
+        "id": resource.id,
+    }
+
+
+def export_resources(instance) -> dict:
+    # Only the resources other shards attach account roles to are exported
+    resources = {}
+    for attribute in ("topics", "buckets", "containers"):
+        if hasattr(instance, attribute):
+            resources[attribute] = {name: _resource_reference(resource) for name, resource in getattr(instance, attribute).items()}
+    if hasattr(instance, "subscriptions"):
+        resources["subscriptions"] = {
+            topic_name: {name: _resource_reference(resource) for name, resource in subscriptions.items()}
+            for topic_name, subscriptions in instance.subscriptions.items()
+        }
+    for attribute in ("namespace", "storage_account"):
+        if getattr(instance, attribute, None) is not None:
+            resources[attribute] = _resource_reference(getattr(instance, attribute))
+    return resources
+
+
+def export_platform_config(platform_config: dict) -> dict:
+    return {
+        key: Output.secret(value) if key in SECRET_CONFIG_KEYS else value
+        for key, value in platform_config.items()
+    }
+
+
+def _output_value(output: Output, *path: str) -> Output:
+    def get_value(value):
+        for key in path:
+            value = value[key]
+        return value
+    return output.apply(get_value)
+
+
+def _reference_view(resources: Output, *path: str) -> SimpleNamespace:
+    return SimpleNamespace(name=_output_value(resources, *path, "name"), id=_output_value(resources, *path, "id"))
+
+
+def _broker_view(broker_id: str, broker_config: dict, resources: Output) -> SimpleNamespace:
+    # Stands in for the broker instance when account roles are added in the products shard
+    topics = broker_config.get("topics", {})
+    broker_view = SimpleNamespace(
+        project_id=broker_config.get("projectID"),
+        namespace_name=broker_config.get("azsbNamespace", broker_id),
+        topics={topic_name: _reference_view(resources, "topics", topic_name) for topic_name in topics},
+        subscriptions={
+            topic_name: {
+                subscription_name: _reference_view(resources, "subscriptions", topic_name, subscription_name)
+                for subscription_name in topic_config.get("subscriptions", {})
+            }
+            for topic_name, topic_config in topics.items()
+        },
+    )
+    if broker_config["type"] == "servicebus":
+        broker_view.namespace = _reference_view(resources, "namespace")
+    return broker_view
+
+
+def _storage_view(storage_id: str, storage_config: dict, resources: Output) -> SimpleNamespace:
+    buckets = storage_config.get("buckets", {})
+    storage_view = SimpleNamespace(
+        project_id=storage_config.get("projectID"),
+        account_name=storage_config.get("accountStorageID", storage_id),
+    )
+    if storage_config["type"] == "abs":
+        storage_view.containers = {bucket_name: _reference_view(resources, "containers", bucket_name) for bucket_name in buckets}
+        storage_view.storage_account = _reference_view(resources, "storage_account")
+    else:
+        storage_view.buckets = {bucket_name: _reference_view(resources, "buckets", bucket_name) for bucket_name in buckets}
+    return storage_view
+
+
+def _referenced_platform_config(resource_type: str, platform_config: Output) -> dict:
+    return {key: _output_value(platform_config, key) for key in EXPORTED_CONFIG_KEYS[resource_type]}
+
+
+def _use_platform_stack(shard_config: dict):
+    platform_reference = get_stack_reference(shard_config, PLATFORM_ROLE)
+    return infrastructure.use_platform_outputs(
+        platform_reference.get_output("kubeconfig"),
+        platform_reference.get_output("workspaces"),
+    )
+
+
+def deploy_platform_shard():
+    with instrumentation.phase("create_cluster"):
+        infrastructure.create_cluster(config.cluster)
+    with instrumentation.phase("create_workspaces"):
+        workspaces, kubeconfig = infrastructure.create_workspaces(config.brokers, config.storage, config.accounts)
+
+    pulumi.export("kubeconfig", Output.secret(kubeconfig))
+    pulumi.export("workspaces", workspaces)
+
+
+def deploy_broker_shard(shard_config: dict, broker_id: str):
+    _use_platform_stack(shard_config)
+    with instrumentation.phase("create_brokers"):
+        broker_resources, brokers_platform_config = infrastructure.create_brokers({broker_id: config.brokers[broker_id]})
+
+    pulumi.export("platformConfig", export_platform_config(brokers_platform_config[broker_id]))
+    pulumi.export("resources", export_resources(broker_resources[broker_id]))
+
+
+def deploy_storage_shard(shard_config: dict, storage_id: str):
+    _use_platform_stack(shard_config)
+    with instrumentation.phase("create_storage"):
+        storage_resources, storage_platform_config = infrastructure.create_storage({storage_id: config.storage[storage_id]})
+
+    pulumi.export("platformConfig", export_platform_config(storage_platform_config[storage_id]))
+    pulumi.export("resources", export_resources(storage_resources[storage_id]))
+
+
+def deploy_products_shard(shard_config: dict):
+    kubernetes_provider = _use_platform_stack(shard_config)
+
+    broker_resources = {}
+    brokers_platform_config = {}
+    for broker_id, broker_config in config.brokers.items():
+        broker_reference = get_stack_reference(shard_config, BROKER_ROLE, broker_id)
+        broker_resources[broker_id] = _broker_view(broker_id, broker_config, broker_reference.get_output("resources"))
+        brokers_platform_config[broker_id] = _referenced_platform_config(broker_config["type"], broker_reference.get_output("platformConfig"))
+
+    storage_resources = {}
+    storage_platform_config = {}
+    for storage_id, storage_config in config.storage.items():
+        storage_reference = get_stack_reference(shard_config, STORAGE_ROLE, storage_id)
+        storage_resources[storage_id] = _storage_view(storage_id, storage_config, storage_reference.get_output("resources"))
+        storage_platform_config[storage_id] = _referenced_platform_config(storage_config["type"], storage_reference.get_output("platformConfig"))
+
+    with instrumentation.phase("create_accounts"):
+        account_platform_config = infrastructure.create_accounts(config.accounts, broker_resources, storage_resources)
+
+    return kubernetes_provider, brokers_platform_config, storage_platform_config, account_platform_config
+
+
+def deploy_shard(shard_config: dict):
+    # Returns the infrastructure export of the products shard, the other shards only export stack outputs
+    role = shard_config["role"]
+    if role == PLATFORM_ROLE:
+        deploy_platform_shard()
+    elif role == BROKER_ROLE:
+        deploy_broker_shard(shard_config, shard_config["id"])
+    elif role == STORAGE_ROLE:
+        deploy_storage_shard(shard_config, shard_config["id"])
+    elif role == PRODUCTS_ROLE:
+        return deploy_products_shard(shard_config)
+    else:
+        raise pulumi.RunError(f"Unknown shard role <{role}>, expected one of: {PLATFORM_ROLE}, {BROKER_ROLE}, {STORAGE_ROLE}, {PRODUCTS_ROLE}")
+    return None